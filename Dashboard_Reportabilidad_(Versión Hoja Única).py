@@ -1,180 +1,429 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
 from datetime import date
-import locale
+import os
+
+# Solo lo liviano al comenzar: pandas, Plotly, openpyxl y el resto de reportabilidad se importan
+# recién en la rama que los usa (al procesar un archivo o mostrar una sección).
+from reportabilidad.cache import file_hash, get_parse_cache, make_key
+from reportabilidad.configuracion import HUELLA_CONFIG, REFERENCIAS, SECCIONES
+from reportabilidad.pagina import setup_page
+from reportabilidad.tiempos import annotate, stage, start_run
+
+# Registro de la duración de cada etapa de este rerun (panel de depuración y logs/tiempos.jsonl).
+timer = start_run(app="hoja_unica")
 
 # --- CONFIGURACIÓN DE LA PÁGINA ---
-try:
-    locale.setlocale(locale.LC_TIME, 'es_ES.UTF-8')
-except locale.Error:
-    locale.setlocale(locale.LC_TIME, 'Spanish')
-    
-st.set_page_config(page_title="Dashboard de Reportabilidad SIMON IV Truper - Sistech & Solusof",
-                   page_icon="📊",
-                   layout="wide")
-
-# --- ESTILOS VISUALES ---
-st.markdown("""
-<style>
-    body, .stApp, .stMarkdown, .stMetricLabel, .stMetricValue, .stButton>button, .stSubheader, .stDataFrame, div[data-testid="stDataFrame"] table {
-        color: black !important;
-        font-weight: bold !important;
-    }
-    h1, h2, h3, h4, h5, h6 {
-        color: black !important;
-        font-weight: bold !important;
-    }
-    div[data-testid="stDataFrame"] tbody tr td, div[data-testid="stDataFrame"] thead tr th {
-        color: black !important;
-        font-weight: bold !important;
-    }
-    .stMetric {
-        border-radius: 10px;
-        background-color: #F0F2F6;
-        padding: 15px;
-        box-shadow: 0 4px 8px 0 rgba(0,0,0,0.2);
-    }
-    @media print {
-        [data-testid="stSidebar"], [data-testid="stToolbar"] { display: none; }
-        [data-testid="stAppViewContainer"] { padding: 0 !important; }
-        .main .block-container { padding: 1rem !important; }
-    }
-</style>
-""", unsafe_allow_html=True)
+setup_page()
 
 # --- FUNCIONES AUXILIARES ---
 
-def parse_table_from_sheet(uploaded_file, sheet_name, start_row):
-    """Lee una tabla específica desde una hoja de Excel, comenzando en la fila indicada."""
-    try:
-        # El usuario proporciona el número de fila (1-based) de Excel donde aparece "Prestadores".
-        # El encabezado de niveles múltiples se encuentra en esa fila y la anterior.
-        header_indices = [start_row - 2, start_row - 1]
-        
-        df = pd.read_excel(uploaded_file, sheet_name=sheet_name, header=header_indices, 
-                           index_col=0, engine='openpyxl')
-        
-        # Nos quedamos solo con las primeras 3 filas de datos leídos (2 proveedores + fila de total)
-        df = df.head(3)
-        
-        df.columns = ['_'.join(map(str, col)).strip() for col in df.columns.values]
-        df.index.name = 'Prestador'
-        df = df.reset_index()
-
-        providers_of_interest = ["AC_avl_Solusof", "AC_avl_Sistech", "AC_avl_truper"]
-        df = df[df['Prestador'].isin(providers_of_interest)]
-        df['Prestador'] = df['Prestador'].replace('AC_avl_truper', 'AC_avl_Sistech')
-
-        data = {}
-        rangos_cols = {
-            '<2 min': ('<2 min_Promedio de Diferencia', '<2 min_Cuenta de Placas'),
-            '2-5 min': ('2-5 min_Promedio de Diferencia', '2-5 min_Cuenta de Placas'),
-            '5-10 min': ('5-10 min_Promedio de Diferencia', '5-10 min_Cuenta de Placas'),
-            '≥10 min': ('≥10 min_Promedio de Diferencia', '≥10 min_Cuenta de Placas')
-        }
-        
-        for provider_name in ["AC_avl_Solusof", "AC_avl_Sistech"]:
-            provider_row = df[df['Prestador'] == provider_name]
-            if not provider_row.empty:
-                promedios, cantidades = [], []
-                for rango_key, (prom_col_base, cant_col_base) in rangos_cols.items():
-                    actual_prom_col = next((c for c in df.columns if prom_col_base in c), None)
-                    actual_cant_col = next((c for c in df.columns if cant_col_base in c), None)
-                    
-                    prom = str(provider_row[actual_prom_col].iloc[0]) if actual_prom_col and not pd.isna(provider_row[actual_prom_col].iloc[0]) else "00:00:00"
-                    cant = int(provider_row[actual_cant_col].iloc[0]) if actual_cant_col and not pd.isna(provider_row[actual_cant_col].iloc[0]) else 0
-                    promedios.append(prom)
-                    cantidades.append(cant)
-                data[provider_name] = {"promedios": promedios, "cantidades": cantidades}
-            else:
-                data[provider_name] = {"promedios": ["00:00:00"]*4, "cantidades": [0]*4}
-        return data
-    except Exception as e:
-        st.sidebar.error(f"Error al leer la tabla en la fila {start_row} de la hoja '{sheet_name}': {e}")
-        return None
-
-def create_section_dashboard(title, section_data):
-    """Genera el dashboard para una sección específica."""
+def create_section_dashboard(title, section_data, figures=None, reference=None, referencia=None, worst=None):
+    """Genera el dashboard para una sección específica.
+
+    Con `reference` (n_días, datos de la sección en esos días) los totales muestran la diferencia
+    contra la `referencia` elegida (día anterior o promedio de los últimos días). Con `worst`
+    ({prestador: peores reportes}, solo desde registros crudos) se agrega el detalle de placas.
+    """
+    from reportabilidad.graficos import build_section_view, build_slot_heatmap, format_delta, indicator_deltas, main_totals, short_name
+
     st.title(f"📊 Análisis: {title}")
     
-    rangos = ['<2 min', '2-5 min', '5-10 min', '≥10 min']
-    all_data = [{'Prestador': p, 'Rango': r, 'Promedio': d['promedios'][i], 'Cantidad': d['cantidades'][i]}
-                for p, d in section_data.items() for i, r in enumerate(rangos)]
-    df = pd.DataFrame(all_data)
+    # Figuras y tabla memorizadas: solo se reconstruyen si cambian los datos de la sección. Las
+    # fechas precalculadas por el vigilante de carpetas traen las figuras ya construidas.
+    view = build_section_view(section_data, figures)
     
-    total_placas_section = df['Cantidad'].sum()
-    df['Porcentaje'] = (df['Cantidad'] / total_placas_section) * 100 if total_placas_section > 0 else 0
-
-    total_solusof = df[df['Prestador'] == 'AC_avl_Solusof']['Cantidad'].sum()
-    total_sistech = df[df['Prestador'] == 'AC_avl_Sistech']['Cantidad'].sum()
-    
-    c1, c2, c3 = st.columns(3)
-    c1.metric("Total Placas en Sección", f"{total_placas_section:,}")
-    c2.metric("Total Solusof", f"{total_solusof:,}")
-    c3.metric("Total Sistech", f"{total_sistech:,}")
+    deltas = indicator_deltas(section_data, reference)
+    principales = main_totals(view)
+    cols = st.columns(1 + len(principales))
+    cols[0].metric("Total Placas en Sección", f"{view['total']:,}", delta=format_delta(deltas['total'], referencia))
+    for col, (provider, total) in zip(cols[1:], principales):
+        col.metric(f"Total {short_name(provider)}", f"{total:,}", delta=format_delta(deltas['totales'].get(provider), referencia))
     st.markdown("---")
 
-    st.subheader("Comparativa de Cantidad de Placas por Rango")
-    fig_cant = px.bar(df, x="Rango", y="Cantidad", color="Prestador", barmode="group", text_auto=True, color_discrete_map={'AC_avl_Solusof': '#0083B8', 'AC_avl_Sistech': '#FF4B4B'})
-    fig_cant.update_layout(height=400, plot_bgcolor="rgba(0,0,0,0)", xaxis={'categoryorder':'array', 'categoryarray':rangos}, font=dict(color="black", family="Arial Black"), yaxis_title="Nº de Placas")
-    st.plotly_chart(fig_cant, use_container_width=True)
-
-    st.subheader("Distribución Porcentual por Rango")
-    fig_perc = px.bar(df, x="Rango", y="Porcentaje", color="Prestador", barmode="group", text_auto='.1f', color_discrete_map={'AC_avl_Solusof': '#0083B8', 'AC_avl_Sistech': '#FF4B4B'})
-    fig_perc.update_layout(height=400, plot_bgcolor="rgba(0,0,0,0)", xaxis={'categoryorder':'array', 'categoryarray':rangos}, yaxis=dict(ticksuffix="%"), font=dict(color="black", family="Arial Black"), yaxis_title="% del Total de la Sección")
-    fig_perc.update_traces(texttemplate='%{y:.1f}%')
-    st.plotly_chart(fig_perc, use_container_width=True)
-
-    st.subheader("Tabla de Datos Resumen")
-    df_display = df.copy()
-    df_display['Porcentaje'] = df_display['Porcentaje'].map('{:.1f}%'.format)
-    df_pivot = df_display.pivot(index='Prestador', columns='Rango', values=['Promedio', 'Cantidad', 'Porcentaje']).fillna(0)
-    df_pivot = df_pivot.reindex(columns=rangos, level=1)
-    st.dataframe(df_pivot, use_container_width=True)
+    # Serializar las figuras y la tabla para enviarlas al navegador también tiene su costo.
+    with stage("enviar_figuras"):
+        # Con registros crudos, los percentiles de latencia se muestran junto a los gráficos.
+        if view['cuantiles'] is not None:
+            col_graficos, col_cuantiles = st.columns([3, 1])
+        else:
+            col_graficos, col_cuantiles = st.container(), None
+
+        with col_graficos:
+            st.subheader("Comparativa de Cantidad de Placas por Rango")
+            st.plotly_chart(view['fig_cant'], use_container_width=True, key=f"{title}_cant")
+
+            st.subheader("Distribución Porcentual por Rango")
+            st.plotly_chart(view['fig_perc'], use_container_width=True, key=f"{title}_perc")
+
+        if col_cuantiles is not None:
+            with col_cuantiles:
+                st.subheader("Percentiles de Latencia")
+                st.dataframe(view['cuantiles'], use_container_width=True)
+                st.caption("Calculados desde los registros crudos, con un error relativo menor al 1%.")
+
+        # Con registros crudos también se ve en qué horas del día se concentran las demoras.
+        if any("franjas" in data for data in section_data.values()):
+            st.subheader("Latencia por Hora del Día")
+            minutos = st.radio("Agrupar en franjas de:", [60, 15], format_func=lambda m: f"{m} minutos",
+                               horizontal=True, key=f"{title}_franjas")
+            fig_franjas = build_slot_heatmap(section_data, minutos)
+            if fig_franjas is not None:
+                st.plotly_chart(fig_franjas, use_container_width=True, key=f"{title}_franjas_fig")
+                st.caption("% de los reportes de cada franja que cae en cada rango; al pasar el mouse se ve la cantidad de placas.")
+
+    with stage("enviar_tabla"):
+        st.subheader("Tabla de Datos Resumen")
+        st.dataframe(view['pivot'], use_container_width=True)
+
+    if worst:
+        show_worst_plates(title, worst)
     st.markdown("<br><br>", unsafe_allow_html=True)
 
+def show_worst_plates(title, worst):
+    """Detalle paginado de las placas más lentas de la sección; solo se envía la página visible."""
+    from reportabilidad.graficos import worst_plates_page
+    from reportabilidad.ingesta import TOP_PEORES
+
+    with st.expander("🔎 Placas más lentas"):
+        c1, c2, c3 = st.columns(3)
+        provider = c1.selectbox("Prestador", list(worst), key=f"{title}_peores_prestador")
+        page_size = c2.selectbox("Filas por página", [25, 50, 100], key=f"{title}_peores_filas")
+        n_pages = max(1, -(-len(worst[provider]["placas"]) // page_size))
+        # La página vuelve a la primera al cambiar de prestador o de tamaño de página.
+        page = c3.number_input(f"Página (de {n_pages})", min_value=1, max_value=n_pages, value=1,
+                               key=f"{title}_peores_pagina_{provider}_{page_size}")
+        with stage("pagina_peores"):
+            st.dataframe(worst_plates_page(worst[provider], page, page_size), use_container_width=True, hide_index=True)
+        st.caption(f"Los {TOP_PEORES} reportes más lentos de cada prestador en esta sección, de mayor a menor duración.")
+
+def show_export(sections, fecha, raw_sources=None):
+    """Descarga del reporte actual, de un rango de fechas del histórico o de los registros crudos.
+
+    El archivo se genera recién al presionar el botón, bloque a bloque en un temporal en disco.
+    """
+    from datetime import timedelta
+
+    from reportabilidad.exportar import (FORMATOS, MAX_FILAS_DESCARGA, SERVER_EXPORT_DIR, export_file, export_to_server,
+                                         range_chunks, raw_chunks, raw_rows, report_chunks)
+
+    with st.expander("📥 Exportar datos"):
+        opciones = ["Reporte actual", "Rango de fechas del histórico"] + (["Registros crudos"] if raw_sources else [])
+        contenido = st.radio("Qué exportar:", opciones, key="exportar_contenido")
+        formato = st.radio("Formato:", list(FORMATOS), horizontal=True, key="exportar_formato")
+        if contenido == "Rango de fechas del histórico":
+            rango_fechas = st.date_input("Fechas:", (fecha - timedelta(days=29), fecha), key="exportar_rango")
+            if len(rango_fechas) != 2:
+                st.caption("Selecciona la fecha de inicio y de fin del rango.")
+                return
+            desde, hasta = rango_fechas
+            chunks, nombre = lambda: range_chunks(desde, hasta), f"reportabilidad_{desde}_{hasta}"
+        elif contenido == "Registros crudos":
+            chunks, nombre = lambda: raw_chunks(raw_sources), f"registros_{fecha}"
+            filas = raw_rows(sections)
+            if formato != "Parquet" and filas > MAX_FILAS_DESCARGA:
+                # El archivo terminado quedaría entero en la memoria del servidor para la descarga.
+                st.warning(f"{filas:,} registros son demasiados para descargar en {formato}. Elige Parquet "
+                           f"o escribe el archivo en la carpeta de exportaciones del servidor ({SERVER_EXPORT_DIR}).")
+                archivo = st.text_input("Nombre del archivo (sin extensión):", nombre, key="exportar_archivo")
+                if st.button("Exportar en el servidor", use_container_width=True, disabled=not archivo):
+                    try:
+                        with st.spinner("Exportando registros..."):
+                            path = export_to_server(chunks(), formato, archivo + FORMATOS[formato][0])
+                        st.success(f"Exportación escrita en {path}")
+                    except ValueError as e:
+                        st.error(str(e))
+                return
+            if formato == "Excel":
+                st.caption("Para meses completos de registros, CSV y Parquet se generan mucho más rápido que Excel.")
+        else:
+            chunks, nombre = lambda: report_chunks(sections, fecha), f"reportabilidad_{fecha}"
+        extension, mime, _ = FORMATOS[formato]
+        st.download_button("Descargar", data=lambda: export_file(chunks(), formato), file_name=nombre + extension,
+                           mime=mime, on_click="ignore", use_container_width=True)
+
+def infer_analysis_date(names):
+    """Fecha deducida de los nombres de la hoja, los archivos o la carpeta; None si no hay una sola."""
+    from reportabilidad.lote import infer_date
+
+    fechas = {fecha for fecha in map(infer_date, names) if fecha is not None}
+    return fechas.pop() if len(fechas) == 1 else None
+
+def process_raw_sources(sources, sections_key):
+    """Procesa archivos de registros crudos por bloques, mostrando el avance en la barra lateral.
+
+    Devuelve los datos de las secciones y los peores reportes de cada sección y prestador.
+    """
+    from reportabilidad.ingesta import accumulate_records
+
+    # Los rangos se calculan aquí a partir de las marcas de tiempo AVL/HUB/SIMON de cada reporte.
+    parse_cache = get_parse_cache()
+    worst_key = make_key(sections_key, "peores")
+    sections, worst = parse_cache.get(sections_key), parse_cache.get(worst_key)
+    if st.button("Procesar Archivo", use_container_width=True, type="primary") and sections is None:
+        progress_bar = st.progress(0.0, text="Procesando registros...")
+        try:
+            with stage("registros_crudos"):
+                accumulator = accumulate_records(sources, progress=lambda f, msg: progress_bar.progress(f, text=msg))
+                sections, worst = accumulator.sections(), accumulator.worst.result()
+            parse_cache.put(sections_key, sections)
+            parse_cache.put(worst_key, worst)
+        except Exception as e:
+            st.error(f"No se pudo leer el archivo de registros. Error: {e}")
+        progress_bar.empty()
+    return sections, worst
+
 # --- BARRA LATERAL (CENTRO DE CONTROL) ---
 with st.sidebar:
     st.header("Centro de Control ⚙️")
     fecha_analisis = st.date_input("Fecha del Análisis:", date.today())
     
-    uploaded_file = st.file_uploader("Sube tu archivo Excel de análisis", type=["xlsx"])
+    origen = st.radio("Origen de los datos:", ["Tablas dinámicas (Excel)", "Lote de libros Excel", "Registros crudos", "Registros crudos (carpeta del servidor)", "Fechas precalculadas"])
+    uploaded_file = None
+    if origen == "Lote de libros Excel":
+        batch_files = st.file_uploader("Sube los libros Excel del lote", type=["xlsx"], accept_multiple_files=True)
+        all_sheets = st.toggle("Procesar todas las hojas de cada libro", value=False)
+    elif origen == "Registros crudos":
+        uploaded_file = st.file_uploader("Sube la exportación de registros crudos", type=["csv", "parquet", "xlsx"])
+    elif origen == "Registros crudos (carpeta del servidor)":
+        # Para exportaciones mensuales demasiado grandes para subirlas por el navegador.
+        from reportabilidad.ingesta import RAW_DATA_DIR
+
+        raw_dir = st.text_input(f"Carpeta con las exportaciones (CSV/Parquet), dentro de {RAW_DATA_DIR}:")
+    elif origen == "Fechas precalculadas":
+        # Días guardados en el histórico (por ejemplo, por `python -m reportabilidad.vigilante`).
+        from reportabilidad.historico import available_dates, load_day, load_figures
+
+        fechas_guardadas = available_dates()
+        fecha_guardada = st.selectbox("Fecha guardada:", fechas_guardadas[::-1], format_func=lambda f: f.strftime('%d/%m/%Y'))
+    else:
+        uploaded_file = st.file_uploader("Sube tu archivo Excel de análisis", type=["xlsx"])
     
     avl_hub_data, hub_simon_data, avl_simon_data = None, None, None
+    batch_results = None
+    precomputed_figures = {}
+    worst_plates = None
+    raw_sources = None
+    date_names = []  # nombres de donde se puede deducir la fecha de los datos
+
+    if origen == "Lote de libros Excel":
+        if batch_files:
+            from reportabilidad.historico import save_day
+            from reportabilidad.lote import build_jobs, process_batch
+
+            # Cada hoja se procesa en un proceso aparte; las filas con 'Prestadores' se detectan solas.
+            parse_cache = get_parse_cache()
+            batch_key = make_key("lote", [file_hash(f.getvalue()) for f in batch_files], all_sheets, HUELLA_CONFIG)
+            batch_results = parse_cache.get(batch_key)
+            if st.button("Procesar Lote", use_container_width=True, type="primary") and batch_results is None:
+                jobs = build_jobs([(f.name, f.getvalue()) for f in batch_files], all_sheets=all_sheets)
+                progress_bar = st.progress(0.0, text="Procesando lote...")
+                with stage("procesar_lote"):
+                    batch_results = process_batch(jobs, progress=lambda done, total: progress_bar.progress(done / total, text=f"{done}/{total} hojas procesadas"))
+                progress_bar.empty()
+                parse_cache.put(batch_key, batch_results)
+
+            if batch_results is not None and st.session_state.get("historico_guardado") != batch_key:
+                for r in batch_results:
+                    if r["secciones"] and r["fecha"]:
+                        save_day(r["fecha"], r["secciones"])
+                st.session_state["historico_guardado"] = batch_key
+        else:
+            st.info("Esperando los libros Excel del lote.")
+    elif origen == "Fechas precalculadas":
+        if fecha_guardada is not None:
+            try:
+                with stage("cargar_historico"):
+                    sections = load_day(fecha_guardada)
+                    precomputed_figures = load_figures(fecha_guardada)
+                avl_hub_data, hub_simon_data, avl_simon_data = (sections[s] for s in SECCIONES)
+                fecha_analisis = fecha_guardada
+            except ValueError as e:
+                st.error(str(e))
+        else:
+            st.info("El histórico todavía no tiene fechas guardadas.")
+    elif origen == "Registros crudos (carpeta del servidor)":
+        raw_paths = None
+        if raw_dir:
+            from reportabilidad.ingesta import raw_data_files
+
+            # Solo se leen carpetas dentro de la carpeta de registros configurada.
+            try:
+                raw_dir, raw_paths = raw_data_files(raw_dir)
+            except ValueError as e:
+                st.error(str(e))
+        else:
+            st.info("Indica una carpeta de registros del servidor.")
+        if raw_paths is not None:
+            st.caption(f"{len(raw_paths)} archivos encontrados.")
+            # Los archivos del servidor se identifican por ruta, tamaño y fecha de modificación.
+            sections_key = make_key("carpeta", [(p, os.path.getsize(p), os.path.getmtime(p)) for p in raw_paths], HUELLA_CONFIG)
+            sections, worst_plates = process_raw_sources(raw_paths, sections_key)
+            date_names = [os.path.basename(os.path.normpath(raw_dir))] + [os.path.basename(p) for p in raw_paths]
+            if sections is not None:
+                avl_hub_data, hub_simon_data, avl_simon_data = (sections[s] for s in SECCIONES)
+                raw_sources = raw_paths
+    elif uploaded_file is not None and origen == "Registros crudos":
+        sections_key = make_key(file_hash(uploaded_file.getvalue()), "registros", HUELLA_CONFIG)
+        sections, worst_plates = process_raw_sources([uploaded_file], sections_key)
+        date_names = [uploaded_file.name]
+        if sections is not None:
+            avl_hub_data, hub_simon_data, avl_simon_data = (sections[s] for s in SECCIONES)
+            raw_sources = [uploaded_file]
+    elif uploaded_file is not None:
+        from reportabilidad.excel import find_table_rows, parse_sections_from_raw
+        from reportabilidad.instantaneas import open_workbook, read_sheet_snapshot
 
-    if uploaded_file is not None:
         try:
-            xls = pd.ExcelFile(uploaded_file)
-            sheet_options = xls.sheet_names
+            # Todo lo que se obtiene del libro se guarda en la caché compartida usando el hash de su
+            # contenido, así los reruns y las demás sesiones no vuelven a abrirlo ni a procesarlo.
+            parse_cache = get_parse_cache()
+            with stage("hash_archivo"):
+                content_hash = file_hash(uploaded_file.getvalue())
+            annotate(archivo=uploaded_file.name, hash_archivo=content_hash, bytes_archivo=uploaded_file.size)
+            xls = None
+
+            sheets_key = make_key(content_hash, "hojas")
+            sheet_options = parse_cache.get(sheets_key)
+            if sheet_options is None:
+                with stage("abrir_libro"):
+                    xls = open_workbook(uploaded_file)
+                sheet_options = xls.sheet_names
+                parse_cache.put(sheets_key, sheet_options)
             
             selected_sheet = st.selectbox("Selecciona la hoja con las tablas:", sheet_options)
             
             st.markdown("---")
-            st.markdown("Indica la fila donde aparece la palabra **'Prestadores'** para cada tabla:")
+            auto_detect = st.toggle("Detectar automáticamente las filas con 'Prestadores'", value=True)
+            default_rows = [5, 18, 30]
+            if auto_detect:
+                # Recorrido en streaming de la hoja que se detiene al encontrar las tres tablas.
+                rows_key = make_key(content_hash, selected_sheet, "filas")
+                detected_rows = parse_cache.get(rows_key)
+                if detected_rows is None:
+                    detected_rows = find_table_rows(uploaded_file, selected_sheet)
+                    parse_cache.put(rows_key, detected_rows)
+                if len(detected_rows) == len(SECCIONES):
+                    default_rows = detected_rows
+                else:
+                    st.warning(f"Solo se encontraron {len(detected_rows)} de {len(SECCIONES)} tablas con 'Prestadores'. Indica las filas manualmente.")
+                    auto_detect = False
+            else:
+                st.markdown("Indica la fila donde aparece la palabra **'Prestadores'** para cada tabla:")
             
             # El número de fila que se ve en Excel.
-            start_row_avl_hub = st.number_input("Fila con 'Prestadores' para 'AVL a HUB'", min_value=1, value=5)
-            start_row_hub_simon = st.number_input("Fila con 'Prestadores' para 'HUB a SIMON'", min_value=1, value=18)
-            start_row_avl_simon = st.number_input("Fila con 'Prestadores' para 'AVL a SIMON'", min_value=1, value=30)
-
-            if st.button("Procesar Archivo", use_container_width=True, type="primary"):
-                avl_hub_data = parse_table_from_sheet(uploaded_file, selected_sheet, start_row_avl_hub)
-                hub_simon_data = parse_table_from_sheet(uploaded_file, selected_sheet, start_row_hub_simon)
-                avl_simon_data = parse_table_from_sheet(uploaded_file, selected_sheet, start_row_avl_simon)
+            start_row_avl_hub = st.number_input("Fila con 'Prestadores' para 'AVL a HUB'", min_value=1, value=default_rows[0], disabled=auto_detect)
+            start_row_hub_simon = st.number_input("Fila con 'Prestadores' para 'HUB a SIMON'", min_value=1, value=default_rows[1], disabled=auto_detect)
+            start_row_avl_simon = st.number_input("Fila con 'Prestadores' para 'AVL a SIMON'", min_value=1, value=default_rows[2], disabled=auto_detect)
+
+            start_rows = dict(zip(SECCIONES, [start_row_avl_hub, start_row_hub_simon, start_row_avl_simon]))
+            annotate(hoja=selected_sheet, filas_prestadores=start_rows)
+            # Con otra configuración (rangos, prestadores) el mismo libro da otros datos.
+            sections_key = make_key(content_hash, selected_sheet, start_rows, HUELLA_CONFIG)
+            date_names = [selected_sheet, uploaded_file.name]
+            # Si este libro/hoja/filas ya se procesó (en esta u otra sesión) el reporte se muestra
+            # directamente y sobrevive a cualquier interacción posterior con los widgets.
+            sections = parse_cache.get(sections_key)
+
+            if st.button("Procesar Archivo", use_container_width=True, type="primary") and sections is None:
+                # Una sola lectura de la hoja para las tres tablas: la primera vez desde el Excel (que
+                # queda guardado como instantánea Parquet) y las siguientes, con otras filas, desde la instantánea.
+                try:
+                    raw = read_sheet_snapshot(xls or uploaded_file, selected_sheet, content_hash)
+                    sections = parse_sections_from_raw(raw, selected_sheet, start_rows)
+                    parse_cache.put(sections_key, sections)
+                except ValueError as e:
+                    st.sidebar.error(str(e))
+
+            if sections is not None:
+                avl_hub_data, hub_simon_data, avl_simon_data = (sections[s] for s in SECCIONES)
         except Exception as e:
             st.error(f"No se pudo leer el archivo Excel. Error: {e}")
     else:
-        st.info("Esperando archivo Excel para generar el reporte.")
+        st.info("Esperando archivo para generar el reporte.")
+
+    reference, referencia = None, None
+    if origen == "Fechas precalculadas":
+        pass  # el día ya está en el histórico
+    elif avl_hub_data and hub_simon_data and avl_simon_data:
+        # El día se guarda en el histórico solo al presionar el botón y con una fecha cierta: la que
+        # figura en el nombre de la hoja o del archivo o, si no hay, la del selector confirmada a mano
+        # (nunca la de hoy que el selector trae por defecto).
+        fecha_deducida = infer_analysis_date(date_names)
+        if fecha_deducida is not None:
+            fecha_analisis = fecha_deducida
+            st.caption(f"Fecha tomada del nombre del archivo: {fecha_analisis.strftime('%d/%m/%Y')}.")
+            fecha_confirmada = True
+        else:
+            fecha_confirmada = st.checkbox(f"Los datos son del {fecha_analisis.strftime('%d/%m/%Y')}")
+        history_key = f"{sections_key}-{fecha_analisis}"
+        if st.session_state.get("historico_guardado") != history_key:
+            if st.button("💾 Guardar en histórico", use_container_width=True, disabled=not fecha_confirmada):
+                from reportabilidad.historico import save_day
+
+                with stage("guardar_historico"):
+                    save_day(fecha_analisis, dict(zip(SECCIONES, [avl_hub_data, hub_simon_data, avl_simon_data])))
+                st.session_state["historico_guardado"] = history_key
+        if st.session_state.get("historico_guardado") == history_key:
+            st.caption(f"Resultados guardados en el histórico para el {fecha_analisis.strftime('%d/%m/%Y')}.")
+
+    if avl_hub_data and hub_simon_data and avl_simon_data:
+        # Los totales del histórico se obtienen de sus sumas acumuladas, sin recorrer todos los días.
+        from reportabilidad.historico import reference_totals
+
+        referencia = st.radio("Comparar los totales con:", list(REFERENCIAS), horizontal=True)
+        try:
+            with stage("referencia_historico"):
+                reference = reference_totals(fecha_analisis, referencia)
+            if reference is None:
+                st.caption("No hay días anteriores guardados para comparar.")
+        except ValueError as e:
+            st.warning(f"No se puede comparar con el histórico: {e}")
+
+        show_export(dict(zip(SECCIONES, [avl_hub_data, hub_simon_data, avl_simon_data])), fecha_analisis, raw_sources)
 
 # --- PÁGINA PRINCIPAL (DASHBOARD) ---
 st.header(f"Reportabilidad SIMON IV Truper - {fecha_analisis.strftime('%d de %B, %Y')}")
 st.markdown("---")
 
-if avl_hub_data and hub_simon_data and avl_simon_data:
-    create_section_dashboard("AVL a HUB", avl_hub_data)
-    create_section_dashboard("HUB a SIMON", hub_simon_data)
-    create_section_dashboard("AVL a SIMON", avl_simon_data)
+if batch_results is not None:
+    import pandas as pd
+    from reportabilidad.lote import results_to_frame
+
+    st.title("📊 Resultados del Lote")
+    estado = pd.DataFrame([
+        {"Archivo": r["archivo"], "Hoja": r["hoja"], "Fecha": r["fecha"] or "(sin fecha)",
+         "Estado": f"❌ {r['error']}" if r["error"] else "✅ Correcto"}
+        for r in batch_results
+    ])
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Hojas Procesadas", f"{len(batch_results):,}")
+    c2.metric("Hojas con Error", f"{sum(1 for r in batch_results if r['error']):,}")
+    c3.metric("Días Distintos", f"{len({r['fecha'] for r in batch_results if r['secciones'] and r['fecha']}):,}")
+    st.subheader("Estado por Archivo")
+    st.dataframe(estado, use_container_width=True, hide_index=True)
+    st.caption("Los días con fecha reconocida en el nombre del archivo o de la hoja se guardaron en el histórico.")
+    st.subheader("Conjunto de Datos del Lote")
+    st.dataframe(results_to_frame(batch_results), use_container_width=True, hide_index=True)
+elif avl_hub_data and hub_simon_data and avl_simon_data:
+    for title, data in zip(SECCIONES, [avl_hub_data, hub_simon_data, avl_simon_data]):
+        section_reference = (reference[0], reference[1].get(title, {})) if reference else None
+        create_section_dashboard(title, data, precomputed_figures.get(title), section_reference, referencia,
+                                 worst_plates.get(title) if worst_plates else None)
 else:
-    st.warning("Por favor, sube un archivo Excel y presiona 'Procesar Archivo' para ver el reporte.")
\ No newline at end of file
+    st.warning("Por favor, sube un archivo y presiona 'Procesar Archivo' para ver el reporte.")
+
+# --- PANEL DE RENDIMIENTO (DEPURACIÓN) ---
+with st.sidebar.expander("⏱️ Rendimiento de este rerun", expanded=False):
+    etapas = timer.summary()
+    if etapas:
+        import pandas as pd
+
+        st.dataframe(pd.DataFrame(etapas, columns=["Etapa", "Tiempo (ms)", "Veces"]).round({"Tiempo (ms)": 1}),
+                     use_container_width=True, hide_index=True)
+    else:
+        st.caption("Todo se obtuvo de la caché; no se midió ninguna etapa.")
+    st.caption(f"Total del rerun: {timer.total() * 1000:,.1f} ms")
+try:
+    timer.write_log()
+except OSError:
+    pass
@@ -0,0 +1 @@
+"""Benchmarks reproducibles de los dashboards de reportabilidad."""
@@ -0,0 +1,137 @@
+"""Benchmark del arranque en frío de los dashboards, con un presupuesto de tiempo.
+
+Cada medición se hace en un intérprete nuevo, como después de reiniciar el servidor:
+
+- importar Streamlit (igual para todos los dashboards, se informa aparte);
+- primer elemento: desde que comienza el script hasta que envía el primer elemento al navegador
+  (estilos y barra lateral), que es lo que el usuario ve primero;
+- primera ejecución: desde que comienza el script hasta que termina la pantalla inicial, con sus
+  importaciones (sin el arranque del arnés de AppTest);
+- sesión nueva: otra sesión completa en el mismo servidor, con los módulos ya importados.
+
+También lista los módulos pesados que quedaron importados en la pantalla inicial. Termina con
+código 1 si la mediana de la primera ejecución o del primer elemento supera el presupuesto.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.bench_arranque [--repeticiones 3] [--presupuesto-arranque 2.0] [--presupuesto-primer-elemento 0.25]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARDS = {
+    "hoja_unica": "Dashboard_Reportabilidad_(Versión Hoja Única).py",
+    "segregada": "dasboard_Reportabilidad_(Versión Segregada).py",
+    "manual": "dashboard_de_reportabilidad.py",
+    "historico": "dashboard_historico.py",
+}
+MODULOS_PESADOS = ["pandas", "plotly.express", "openpyxl", "pyarrow", "reportabilidad.graficos", "reportabilidad.historico"]
+
+# Se ejecuta en el proceso nuevo; imprime las medidas como JSON en la última línea.
+MEDICION = """
+import json, sys, time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+from streamlit.runtime.scriptrunner_utils.script_run_context import ScriptRunContext
+importar_streamlit = time.perf_counter() - inicio
+
+# El evento de auditoría 'exec' marca el comienzo del script (sin el arranque del arnés de AppTest).
+comienzo_script = []
+def auditar(evento, args):
+    if evento == "exec" and not comienzo_script and getattr(args[0], "co_filename", None) == sys.argv[1]:
+        comienzo_script.append(time.perf_counter())
+sys.addaudithook(auditar)
+
+primer_elemento = []
+enqueue = ScriptRunContext.enqueue
+def enqueue_medido(self, msg):
+    if not primer_elemento and msg.HasField("delta"):
+        primer_elemento.append(time.perf_counter())
+    return enqueue(self, msg)
+ScriptRunContext.enqueue = enqueue_medido
+
+at = AppTest.from_file(sys.argv[1], default_timeout=300)
+at.run()
+fin = time.perf_counter()
+pesados = [m for m in json.loads(sys.argv[2]) if m in sys.modules]
+
+inicio_sesion = time.perf_counter()
+AppTest.from_file(sys.argv[1], default_timeout=300).run()
+print(json.dumps({
+    "importar_streamlit_s": importar_streamlit,
+    "primer_elemento_s": (primer_elemento or [fin])[0] - comienzo_script[0],
+    "primera_ejecucion_s": fin - comienzo_script[0],
+    "sesion_nueva_s": time.perf_counter() - inicio_sesion,
+    "modulos_pesados": pesados,
+    "error": [str(e.value) for e in at.exception],
+}))
+"""
+
+
+def measure_cold_start(script, directorio):
+    """Mide un dashboard en un intérprete nuevo y devuelve el dict de medidas."""
+    env = dict(os.environ,
+               REPORTABILIDAD_CACHE_DIR=os.path.join(directorio, "cache"),
+               REPORTABILIDAD_HISTORICO=os.path.join(directorio, "historico.sqlite"),
+               REPORTABILIDAD_LOG_TIEMPOS=os.path.join(directorio, "tiempos.jsonl"),
+               PYTHONPATH=RAIZ + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proceso = subprocess.run([sys.executable, "-c", MEDICION, os.path.join(RAIZ, script), json.dumps(MODULOS_PESADOS)],
+                             cwd=RAIZ, env=env, capture_output=True, text=True, check=True)
+    return json.loads(proceso.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Arranque en frío de los dashboards de reportabilidad.")
+    parser.add_argument("--dashboards", nargs="+", choices=list(DASHBOARDS), default=list(DASHBOARDS))
+    parser.add_argument("--repeticiones", type=int, default=3, help="Procesos nuevos por dashboard (se usa la mediana).")
+    parser.add_argument("--presupuesto-arranque", type=float, default=2.0,
+                        help="Segundos máximos para la primera ejecución completa de la pantalla inicial.")
+    parser.add_argument("--presupuesto-primer-elemento", type=float, default=0.25,
+                        help="Segundos máximos hasta enviar el primer elemento al navegador.")
+    parser.add_argument("--salida", help="Guarda los resultados de esta corrida en este JSON.")
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    excedidos = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for nombre in args.dashboards:
+            medidas = [measure_cold_start(DASHBOARDS[nombre], directorio) for _ in range(args.repeticiones)]
+            resumen = {
+                clave: statistics.median(m[clave] for m in medidas)
+                for clave in ("importar_streamlit_s", "primer_elemento_s", "primera_ejecucion_s", "sesion_nueva_s")
+            }
+            resumen["modulos_pesados"] = medidas[-1]["modulos_pesados"]
+            resumen["error"] = medidas[-1]["error"]
+            resultados[nombre] = resumen
+            print(f"{nombre:>10}  streamlit {resumen['importar_streamlit_s'] * 1000:7.0f} ms  "
+                  f"primer elemento {resumen['primer_elemento_s'] * 1000:7.0f} ms  "
+                  f"primera ejecución {resumen['primera_ejecucion_s'] * 1000:7.0f} ms  "
+                  f"sesión nueva {resumen['sesion_nueva_s'] * 1000:7.0f} ms  "
+                  f"pesados: {', '.join(resumen['modulos_pesados']) or '-'}")
+            if resumen["error"]:
+                excedidos.append(f"{nombre}: el script terminó con error: {resumen['error']}")
+            if resumen["primera_ejecucion_s"] > args.presupuesto_arranque:
+                excedidos.append(f"{nombre}: primera ejecución {resumen['primera_ejecucion_s']:.2f} s "
+                                 f"(presupuesto {args.presupuesto_arranque:.2f} s)")
+            if resumen["primer_elemento_s"] > args.presupuesto_primer_elemento:
+                excedidos.append(f"{nombre}: primer elemento {resumen['primer_elemento_s']:.2f} s "
+                                 f"(presupuesto {args.presupuesto_primer_elemento:.2f} s)")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"repeticiones": args.repeticiones, "resultados": resultados}, f, indent=2, ensure_ascii=False)
+    for mensaje in excedidos:
+        print(f"FUERA DE PRESUPUESTO {mensaje}")
+    if not excedidos:
+        print("Todos los dashboards arrancan dentro del presupuesto.")
+    return 1 if excedidos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""Prueba de carga local: varias sesiones simultáneas de un dashboard, con la API de testing de Streamlit.
+
+Cada sesión es un AppTest en su propio hilo, todas dentro del mismo proceso, como los navegadores
+conectados a un mismo servidor (comparten la caché de resultados, el histórico, el script compilado
+y el GIL; ver share_server). Todas las sesiones arrancan juntas y repiten la interacción típica del dashboard:
+
+- hoja_unica: abre la página, sube un libro, desactiva la detección automática, indica las tres
+  filas 'Prestadores' y presiona "Procesar Archivo";
+- segregada y manual: abren la página y cambian `--cambios` cantidades (number_input).
+
+Cada cantidad de sesiones se mide en un proceso nuevo, con caché e histórico vacíos, y se informan
+los percentiles de la latencia de cada rerun y el pico de memoria del proceso. Con
+--presupuesto-p95 también se informa cuántas sesiones simultáneas se atienden dentro de ese p95.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.bench_carga [--dashboards hoja_unica] [--sesiones 1 2 4 8] [--tamano mediano] [--mismo-libro]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_arranque import DASHBOARDS, RAIZ
+from benchmarks.sinteticos import FILAS_PRESTADORES, TAMANOS, ensure_workbook
+
+DATOS_DEFAULT = os.path.join(RAIZ, ".cache", "benchmarks")
+# share_server reemplaza piezas internas de streamlit.testing (app_test.Runtime, ScriptCache) que
+# cambian entre versiones; solo se probó con esta serie, así que con otra la prueba no arranca.
+STREAMLIT_PROBADO = "1.65"
+PERCENTILES = (50, 90, 95, 99)
+
+# Se ejecuta en el proceso nuevo de cada cantidad de sesiones; imprime el resultado como JSON.
+NIVEL = """
+import json, sys
+from benchmarks.bench_carga import run_level
+print(json.dumps(run_level(**json.loads(sys.argv[1]))))
+"""
+
+
+def peak_memory_mb():
+    """Pico de memoria residente de este proceso en MB, o None si no se puede obtener."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.Process().memory_info().peak_wset / 1024**2
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024**2 if sys.platform == "darwin" else pico / 1024
+
+
+def check_streamlit_version():
+    """Devuelve un mensaje de error si la versión instalada de Streamlit no es STREAMLIT_PROBADO.x."""
+    import streamlit
+
+    if streamlit.__version__.split(".")[:2] != STREAMLIT_PROBADO.split("."):
+        return (f"la prueba de carga depende de piezas internas de Streamlit {STREAMLIT_PROBADO}.x y está "
+                f"instalada la {streamlit.__version__}; revisa share_server y actualiza STREAMLIT_PROBADO")
+    return None
+
+
+def share_server():
+    """Hace que los AppTest de este proceso compartan el Runtime y el script compilado, como las
+    sesiones de un servidor real.
+
+    AppTest está pensado para una sesión por vez: en cada rerun crea el Runtime global y vuelve a
+    compilar el script, y al terminar borra el Runtime, así que dos sesiones en hilos simultáneos se
+    quitan el Runtime una a otra. Aquí el Runtime se crea una sola vez y AppTest solo modifica una
+    subclase que nadie consulta.
+    """
+    error = check_streamlit_version()
+    if error:
+        raise RuntimeError(error)
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    runtime = app_test.MagicMock(spec=Runtime)
+    runtime.media_file_mgr = app_test.MediaFileManager(app_test.MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = app_test.DataframeSourceManager()
+    runtime.cache_storage_manager = app_test.MemoryCacheStorageManager()
+    runtime.bidi_component_registry = app_test.BidiComponentManager()
+    Runtime._instance = runtime
+    app_test.Runtime = type("RuntimeDeUnaSesion", (Runtime,), {})
+
+    script_cache = app_test.ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    # Cada rerun activa esta opción y la restaura al terminar; con varias sesiones a la vez se
+    # restauraría en medio del rerun de otra.
+    config.set_option("global.appTest", True)
+
+
+def hoja_unica_steps(at, libro, rng, cambios):
+    """Sube el libro, indica las filas a mano y lo procesa (un rerun por interacción)."""
+    with open(libro, "rb") as f:
+        contenido = f.read()
+    yield "subir_libro", lambda: at.file_uploader[0].upload(os.path.basename(libro), contenido).run()
+    yield "detectar_filas", lambda: at.toggle[0].set_value(False).run()
+    for i, fila in enumerate(FILAS_PRESTADORES):
+        yield "fila_prestadores", lambda i=i, fila=fila: _by_label(at.number_input, "Prestadores")[i].set_value(fila).run()
+    yield "procesar_archivo", lambda: _process(at)
+
+
+def _process(at):
+    _by_label(at.button, "Procesar Archivo")[0].click().run()
+    if not any("Análisis" in t.value for t in at.title):
+        raise RuntimeError(f"no se generó el reporte: {'; '.join(e.value for e in at.error) or 'sin mensaje'}")
+
+
+def quantity_steps(at, libro, rng, cambios):
+    """Cambia algunas cantidades de los prestadores (segregada y manual no suben archivos)."""
+    for _ in range(cambios):
+        yield "cantidad", lambda: rng.choice(_by_label(at.number_input, "Cant.")).set_value(rng.randint(0, 50_000)).run()
+
+
+ESCENARIOS = {"hoja_unica": hoja_unica_steps, "segregada": quantity_steps, "manual": quantity_steps}
+
+
+def _by_label(widgets, texto):
+    return [w for w in widgets if texto in w.label]
+
+
+def run_session(script, escenario, libro, seed, cambios, barrera, resultado):
+    """Una sesión completa; agrega a `resultado` (paso, segundos) por rerun y los errores."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    at = AppTest.from_file(script, default_timeout=600)
+    barrera.wait()
+    paso = "abrir_pagina"
+    try:
+        for paso, rerun in [(paso, at.run), *ESCENARIOS[escenario](at, libro, rng, cambios)]:
+            inicio = time.perf_counter()
+            rerun()
+            resultado["reruns"].append((paso, time.perf_counter() - inicio))
+            resultado["errores"].extend(f"{paso}: {e.value}" for e in at.exception)
+    except Exception as e:
+        resultado["errores"].append(f"{paso}: {type(e).__name__}: {e}")
+
+
+def run_level(dashboard, sesiones, libros, cambios):
+    """Corre `sesiones` sesiones simultáneas y devuelve latencias por rerun, errores y memoria."""
+    share_server()
+    script = os.path.join(RAIZ, DASHBOARDS[dashboard])
+    memoria_inicial = peak_memory_mb()
+    barrera = threading.Barrier(sesiones)
+    resultados = [{"reruns": [], "errores": []} for _ in range(sesiones)]
+    hilos = [
+        threading.Thread(target=run_session,
+                         args=(script, dashboard, libros[i % len(libros)], i, cambios, barrera, resultados[i]))
+        for i in range(sesiones)
+    ]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return {
+        "reruns": [rerun for r in resultados for rerun in r["reruns"]],
+        "errores": [error for r in resultados for error in r["errores"]],
+        "duracion_s": time.perf_counter() - inicio,
+        "memoria_inicial_mb": memoria_inicial,
+        "memoria_pico_mb": peak_memory_mb(),
+    }
+
+
+def percentile(valores, p):
+    """Percentil `p` (0-100) con interpolación lineal."""
+    return statistics.quantiles(valores, n=100, method="inclusive")[p - 1] if len(valores) > 1 else valores[0]
+
+
+def summarize(nivel):
+    """Percentiles de latencia (total y por paso), reruns por segundo y memoria de un nivel."""
+    latencias = [segundos for _, segundos in nivel["reruns"]]
+    por_paso = {}
+    for paso, segundos in nivel["reruns"]:
+        por_paso.setdefault(paso, []).append(segundos)
+    resumen = {f"p{p}_s": percentile(latencias, p) for p in PERCENTILES} if latencias else {}
+    resumen.update({
+        "max_s": max(latencias, default=None),
+        "reruns": len(latencias),
+        "reruns_por_s": len(latencias) / nivel["duracion_s"],
+        "memoria_pico_mb": nivel["memoria_pico_mb"],
+        "memoria_inicial_mb": nivel["memoria_inicial_mb"],
+        "por_paso": {paso: {"p50_s": percentile(v, 50), "p95_s": percentile(v, 95)} for paso, v in por_paso.items()},
+        "errores": nivel["errores"],
+    })
+    return resumen
+
+
+def measure_level(dashboard, sesiones, libros, cambios, directorio):
+    """Mide una cantidad de sesiones en un proceso nuevo, con caché e histórico propios."""
+    env = dict(os.environ,
+               REPORTABILIDAD_CACHE_DIR=os.path.join(directorio, "cache"),
+               REPORTABILIDAD_HISTORICO=os.path.join(directorio, "historico.sqlite"),
+               REPORTABILIDAD_LOG_TIEMPOS=os.path.join(directorio, "tiempos.jsonl"),
+               PYTHONPATH=RAIZ + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    parametros = {"dashboard": dashboard, "sesiones": sesiones, "libros": libros, "cambios": cambios}
+    proceso = subprocess.run([sys.executable, "-c", NIVEL, json.dumps(parametros)],
+                             cwd=RAIZ, env=env, capture_output=True, text=True)
+    if proceso.returncode != 0:
+        raise RuntimeError(f"{dashboard} con {sesiones} sesiones terminó con error:\n{proceso.stderr[-2000:]}")
+    return summarize(json.loads(proceso.stdout.strip().splitlines()[-1]))
+
+
+def _mb(valor):
+    return f"{valor:7.0f} MB" if valor is not None else "      - MB"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga con sesiones simultáneas de los dashboards.")
+    parser.add_argument("--dashboards", nargs="+", choices=list(DASHBOARDS), default=list(DASHBOARDS))
+    parser.add_argument("--sesiones", nargs="+", type=int, default=[1, 2, 4, 8], help="Cantidades de sesiones simultáneas a medir.")
+    parser.add_argument("--tamano", choices=list(TAMANOS), default="mediano", help="Tamaño del libro sintético que sube cada sesión.")
+    parser.add_argument("--mismo-libro", action="store_true",
+                        help="Todas las sesiones suben el mismo libro (por defecto cada una sube uno distinto y no aprovecha la caché de las otras).")
+    parser.add_argument("--cambios", type=int, default=6, help="Cantidades que cambia cada sesión en segregada y manual.")
+    parser.add_argument("--presupuesto-p95", type=float, default=None,
+                        help="Segundos de p95 tolerados; informa cuántas sesiones simultáneas quedan dentro.")
+    parser.add_argument("--datos", default=DATOS_DEFAULT, help="Carpeta donde se generan los libros sintéticos.")
+    parser.add_argument("--salida", help="Guarda los resultados de esta corrida en este JSON.")
+    args = parser.parse_args(argv)
+    error = check_streamlit_version()
+    if error:
+        parser.error(error)
+
+    n_libros = 1 if args.mismo_libro else max(args.sesiones)
+    libros = [ensure_workbook(args.datos, args.tamano, seed) for seed in range(n_libros)]
+
+    resultados = {}
+    errores = []
+    for dashboard in args.dashboards:
+        resultados[dashboard] = {}
+        for sesiones in args.sesiones:
+            with tempfile.TemporaryDirectory() as directorio:
+                resumen = measure_level(dashboard, sesiones, libros, args.cambios, directorio)
+            resultados[dashboard][sesiones] = resumen
+            print(f"{dashboard:>10} {sesiones:3d} sesiones  " + "  ".join(
+                f"p{p} {resumen[f'p{p}_s'] * 1000:8.0f} ms" for p in PERCENTILES)
+                + f"  máx {resumen['max_s'] * 1000:8.0f} ms  {resumen['reruns_por_s']:6.1f} reruns/s"
+                + f"  memoria pico {_mb(resumen['memoria_pico_mb'])}")
+            errores.extend(f"{dashboard} ({sesiones} sesiones): {e}" for e in resumen["errores"])
+        if args.presupuesto_p95 is not None:
+            dentro = [n for n, r in resultados[dashboard].items() if r["p95_s"] <= args.presupuesto_p95]
+            print(f"{dashboard:>10} hasta {max(dentro)} sesiones simultáneas con p95 <= {args.presupuesto_p95:.2f} s"
+                  if dentro else f"{dashboard:>10} ninguna cantidad medida queda con p95 <= {args.presupuesto_p95:.2f} s")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"tamano": args.tamano, "mismo_libro": args.mismo_libro, "resultados": resultados},
+                      f, indent=2, ensure_ascii=False)
+    for error in errores[:20]:
+        print(f"ERROR {error}")
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Benchmark por etapas del procesamiento de un libro de reportabilidad.
+
+Mide por separado la apertura del libro, la detección de filas 'Prestadores', la lectura de las
+tablas desde el Excel y desde su instantánea Parquet, y la construcción del DataFrame, la tabla
+pivote y las figuras de cada sección, sobre libros sintéticos de varios tamaños. El lector de Excel
+se elige con --lector para comparar motores (por ejemplo calamine, si está instalado). Compara la mediana de cada etapa con una baseline en JSON y
+termina con código 1 si alguna empeora más que el umbral.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.bench_reportabilidad --guardar-baseline   # registra la baseline de esta máquina
+    python -m benchmarks.bench_reportabilidad                      # compara contra la baseline
+    python -m benchmarks.bench_reportabilidad --lector calamine --baseline benchmarks/baselines/calamine.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import plotly
+
+from benchmarks.sinteticos import FILAS_PRESTADORES, TAMANOS, ensure_workbook
+from reportabilidad.excel import SECCIONES, find_table_rows, parse_sections_from_raw
+from reportabilidad.graficos import build_section_figures, build_section_frame, build_section_pivot
+from reportabilidad.instantaneas import available_readers, default_reader, open_workbook, read_sheet_snapshot, read_sheet_with
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+BASELINE_DEFAULT = os.path.join(DIRECTORIO, "baselines", "baseline.json")
+DATOS_DEFAULT = os.path.join(os.path.dirname(DIRECTORIO), ".cache", "benchmarks")
+
+
+def _measure(func, repeticiones):
+    """Ejecuta `func` varias veces y devuelve (tiempos en segundos, último resultado)."""
+    tiempos = []
+    result = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        result = func()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos, result
+
+
+def bench_workbook(path, repeticiones, lector):
+    """Mide cada etapa sobre un libro y devuelve {etapa: {'mediana_s', 'min_s'}}."""
+    etapas = {}
+    start_rows = dict(zip(SECCIONES, FILAS_PRESTADORES))
+
+    etapas["abrir_libro"], xls = _measure(lambda: open_workbook(path, lector), repeticiones)
+    sheet = xls.sheet_names[0]
+    etapas["detectar_filas"], _ = _measure(lambda: find_table_rows(path, sheet), repeticiones)
+    etapas["leer_tablas"], sections = _measure(
+        lambda: parse_sections_from_raw(read_sheet_with(xls, sheet, lector), sheet, start_rows), repeticiones)
+    with tempfile.TemporaryDirectory() as directory:
+        read_sheet_snapshot(xls, sheet, "bench", lector, directory)  # la primera lectura escribe la instantánea
+        etapas["leer_instantanea"], _ = _measure(
+            lambda: parse_sections_from_raw(read_sheet_snapshot(xls, sheet, "bench", lector, directory), sheet, start_rows),
+            repeticiones)
+    etapas["dataframe_seccion"], frames = _measure(lambda: [build_section_frame(sections[s]) for s in SECCIONES], repeticiones)
+    etapas["tabla_pivote"], _ = _measure(lambda: [build_section_pivot(df) for df in frames], repeticiones)
+    etapas["figuras"], _ = _measure(lambda: [build_section_figures(df) for df in frames], repeticiones)
+    xls.close()
+
+    return {
+        etapa: {"mediana_s": statistics.median(tiempos), "min_s": min(tiempos)}
+        for etapa, tiempos in etapas.items()
+    }
+
+
+def compare(resultados, baseline, umbral):
+    """Devuelve la lista de regresiones (tamaño, etapa, actual, baseline) por encima del umbral."""
+    regresiones = []
+    for tamano, etapas in resultados.items():
+        for etapa, medida in etapas.items():
+            base = baseline.get(tamano, {}).get(etapa)
+            if base and medida["mediana_s"] > base["mediana_s"] * (1 + umbral):
+                regresiones.append((tamano, etapa, medida["mediana_s"], base["mediana_s"]))
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark por etapas de los dashboards de reportabilidad.")
+    parser.add_argument("--tamanos", nargs="+", choices=list(TAMANOS), default=list(TAMANOS))
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE_DEFAULT, help="Archivo JSON con la baseline.")
+    parser.add_argument("--guardar-baseline", action="store_true", help="Guarda los resultados como nueva baseline.")
+    parser.add_argument("--umbral", type=float, default=0.25, help="Empeoramiento tolerado (0.25 = 25%%).")
+    parser.add_argument("--salida", help="Además guarda los resultados de esta corrida en este JSON.")
+    parser.add_argument("--datos", default=DATOS_DEFAULT, help="Carpeta donde se generan los libros sintéticos.")
+    parser.add_argument("--lector", choices=available_readers(), default=None,
+                        help="Lector de Excel a medir (por defecto, el que usan los dashboards).")
+    args = parser.parse_args(argv)
+    lector = args.lector or default_reader()
+
+    resultados = {}
+    for tamano in args.tamanos:
+        path = ensure_workbook(args.datos, tamano)
+        resultados[tamano] = bench_workbook(path, args.repeticiones, lector)
+        for etapa, medida in resultados[tamano].items():
+            print(f"{tamano:>8} {etapa:<18} mediana {medida['mediana_s'] * 1000:10.2f} ms   mín {medida['min_s'] * 1000:10.2f} ms")
+
+    documento = {
+        "entorno": {"python": platform.python_version(), "pandas": pd.__version__, "plotly": plotly.__version__,
+                    "plataforma": platform.platform(), "lector_excel": lector},
+        "repeticiones": args.repeticiones,
+        "resultados": resultados,
+    }
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(documento, f, indent=2, ensure_ascii=False)
+
+    if args.guardar_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(documento, f, indent=2, ensure_ascii=False)
+        print(f"Baseline guardada en {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No hay baseline en {args.baseline}; ejecuta con --guardar-baseline para crearla.")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["resultados"]
+    regresiones = compare(resultados, baseline, args.umbral)
+    for tamano, etapa, actual, base in regresiones:
+        print(f"REGRESIÓN {tamano}/{etapa}: {actual * 1000:.2f} ms (baseline {base * 1000:.2f} ms, +{(actual / base - 1) * 100:.0f}%)")
+    if not regresiones:
+        print(f"Sin regresiones por encima del {args.umbral:.0%} respecto de la baseline.")
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
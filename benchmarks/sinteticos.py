@@ -0,0 +1,69 @@
+"""Libros de Excel sintéticos con el mismo formato que las tablas dinámicas reales.
+
+Cada hoja tiene las tres tablas ('AVL a HUB', 'HUB a SIMON', 'AVL a SIMON') con el encabezado de dos
+filas que espera parse_table_from_sheet: la fila de rangos ('<2 min', ... combinadas de a dos
+columnas) y debajo la fila 'Prestadores' con 'Promedio de Diferencia' / 'Cuenta de Placas'.
+Para simular libros grandes se agregan filas de relleno debajo de las tablas.
+"""
+import os
+import random
+from datetime import time
+
+import openpyxl
+
+from reportabilidad.excel import SECCIONES
+
+RANGOS = ['<2 min', '2-5 min', '5-10 min', '≥10 min']
+PRESTADORES = ["AC_avl_Solusof", "AC_avl_truper", "Total general"]
+FILAS_PRESTADORES = [5, 18, 30]
+
+# Filas de relleno por tamaño de libro.
+TAMANOS = {"pequeno": 0, "mediano": 5_000, "grande": 50_000}
+
+
+def _random_duration(rng, rango_index):
+    limites = [(0, 119), (120, 299), (300, 599), (600, 5999)]
+    seconds = rng.randint(*limites[rango_index])
+    return time(seconds // 3600, seconds % 3600 // 60, seconds % 60)
+
+
+def write_tables(ws, rng, filas_prestadores=FILAS_PRESTADORES):
+    """Escribe las tres tablas con el encabezado de dos filas en la hoja `ws`."""
+    for section, row in zip(SECCIONES, filas_prestadores):
+        ws.cell(row - 3, 1, section)
+        ws.cell(row - 1, 1, "Rango")
+        ws.cell(row, 1, "Prestadores")
+        for i, rango in enumerate(RANGOS):
+            col = 2 + 2 * i
+            ws.cell(row - 1, col, rango)
+            ws.merge_cells(start_row=row - 1, start_column=col, end_row=row - 1, end_column=col + 1)
+            ws.cell(row, col, "Promedio de Diferencia")
+            ws.cell(row, col + 1, "Cuenta de Placas")
+        for j, prestador in enumerate(PRESTADORES):
+            ws.cell(row + 1 + j, 1, prestador)
+            for i in range(len(RANGOS)):
+                ws.cell(row + 1 + j, 2 + 2 * i, _random_duration(rng, i))
+                ws.cell(row + 1 + j, 3 + 2 * i, rng.randint(0, 50_000))
+
+
+def generate_workbook(path, filas_relleno=0, seed=0):
+    """Genera un libro sintético en `path` con `filas_relleno` filas de datos extra debajo de las tablas."""
+    rng = random.Random(seed)
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Reporte"
+    write_tables(ws, rng)
+    for _ in range(filas_relleno):
+        ws.append([f"PLACA{rng.randint(0, 99_999):05d}", rng.choice(PRESTADORES[:2])]
+                  + [rng.randint(0, 10_000) for _ in range(8)])
+    wb.save(path)
+    return path
+
+
+def ensure_workbook(directory, tamano, seed=0):
+    """Devuelve la ruta del libro sintético de ese tamaño, generándolo solo si aún no existe."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"sintetico_{tamano}_{seed}.xlsx")
+    if not os.path.exists(path):
+        generate_workbook(path, TAMANOS[tamano], seed)
+    return path
@@ -0,0 +1,106 @@
+import streamlit as st
+from datetime import date, timedelta
+
+from reportabilidad.configuracion import RANGOS, RANGOS_EFICIENTES, SECCIONES
+from reportabilidad.pagina import setup_page
+
+# --- CONFIGURACIÓN DE LA PÁGINA ---
+setup_page("Histórico de Reportabilidad SIMON IV Truper - Sistech & Solusof")
+
+# --- BARRA LATERAL (CENTRO DE CONTROL) ---
+with st.sidebar:
+    st.header("Centro de Control ⚙️")
+    # El histórico (y con él pandas) se importa recién ahora, con los estilos y el encabezado ya en el navegador.
+    from reportabilidad.historico import available_dates, load_range, load_sketches
+
+    fechas = available_dates()
+    hasta_default = fechas[-1] if fechas else date.today()
+    rango_fechas = st.date_input("Rango de fechas:", (hasta_default - timedelta(days=29), hasta_default))
+    seccion = st.selectbox("Sección:", SECCIONES)
+    st.caption(f"{len(fechas)} días guardados en el histórico.")
+    if len(rango_fechas) == 2:
+        # Todas las secciones del rango; el archivo se genera recién al presionar el botón.
+        from reportabilidad.exportar import FORMATOS, export_file, range_chunks
+
+        formato = st.selectbox("Formato de la exportación:", list(FORMATOS))
+        extension, mime, _ = FORMATOS[formato]
+        st.download_button("📥 Exportar el rango", data=lambda: export_file(range_chunks(*rango_fechas), formato),
+                           file_name=f"reportabilidad_{rango_fechas[0]}_{rango_fechas[1]}{extension}",
+                           mime=mime, on_click="ignore", use_container_width=True)
+
+# --- PÁGINA PRINCIPAL (DASHBOARD) ---
+st.title("📊 Histórico de Reportabilidad SIMON IV Truper")
+
+if len(rango_fechas) != 2:
+    st.warning("Selecciona la fecha de inicio y de fin del rango.")
+    st.stop()
+
+desde, hasta = rango_fechas
+st.markdown(f"Sección **{seccion}** del **{desde.strftime('%d de %B, %Y')}** al **{hasta.strftime('%d de %B, %Y')}**")
+st.markdown("---")
+
+try:
+    df = load_range(desde, hasta)
+except ValueError as e:
+    st.error(str(e))
+    st.stop()
+df = df[df['seccion'] == seccion]
+if df.empty:
+    st.warning("No hay resultados guardados para ese rango. Procesa los archivos en el dashboard diario para alimentar el histórico.")
+    st.stop()
+
+# Los gráficos (plotly) se importan solo cuando hay datos que mostrar.
+import plotly.express as px
+from reportabilidad.cuantiles import quantiles
+from reportabilidad.graficos import build_quantile_table, efficiency_labels, provider_colors
+from reportabilidad.ingesta import format_duration
+
+# --- KPIs del Rango ---
+df['cantidad_rapida'] = df['cantidad'].where(df['rango'].isin(RANGOS[:RANGOS_EFICIENTES]), 0)
+colores = provider_colors(df['prestador'].unique())
+# 'Eficiencia <5 min' con el umbral por defecto; sale del indicador total de los dashboards diarios.
+eficiencia = "Eficiencia " + efficiency_labels()[2].removeprefix("Total ")
+por_dia = df.groupby(['fecha', 'prestador'], as_index=False)[['cantidad', 'cantidad_rapida']].sum()
+por_dia[eficiencia] = 100 * por_dia['cantidad_rapida'] / por_dia['cantidad'].clip(lower=1)
+por_dia = por_dia.rename(columns={'cantidad': 'Cantidad'})
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Días con datos", f"{df['fecha'].nunique()}")
+col2.metric("Total Placas en el Rango", f"{df['cantidad'].sum():,}")
+total_rapido = 100 * df['cantidad_rapida'].sum() / max(df['cantidad'].sum(), 1)
+col3.metric(f"{eficiencia} del Rango", f"{total_rapido:.1f}%")
+st.markdown("---")
+
+# --- Gráficos de Tendencia ---
+st.subheader(f"Evolución de la {eficiencia} por Prestador")
+fig_ef = px.line(por_dia, x='fecha', y=eficiencia, color='prestador', markers=True, color_discrete_map=colores)
+fig_ef.update_layout(height=400, plot_bgcolor="rgba(0,0,0,0)", yaxis=dict(ticksuffix="%"), font=dict(color="black", family="Arial Black"), xaxis_title="Fecha", legend_title_text='')
+st.plotly_chart(fig_ef, use_container_width=True)
+
+st.subheader("Placas Reportadas por Día")
+fig_cant = px.bar(por_dia, x='fecha', y='Cantidad', color='prestador', barmode='group', color_discrete_map=colores)
+fig_cant.update_layout(height=400, plot_bgcolor="rgba(0,0,0,0)", font=dict(color="black", family="Arial Black"), xaxis_title="Fecha", yaxis_title="Nº de Placas", legend_title_text='')
+st.plotly_chart(fig_cant, use_container_width=True)
+
+# --- Percentiles del Rango ---
+# Los bocetos de cada día se combinan sumándolos; solo existen para días procesados desde registros crudos.
+tabla_cuantiles = build_quantile_table({
+    prestador: tuple(valores)
+    for prestador, boceto in load_sketches(desde, hasta, seccion).items()
+    if (valores := quantiles(boceto)) is not None
+})
+if tabla_cuantiles is not None:
+    st.subheader("Percentiles de Latencia del Rango")
+    st.dataframe(tabla_cuantiles, use_container_width=True)
+
+# --- Tabla de Resumen del Rango ---
+st.subheader("Tabla de Datos Resumen del Rango")
+df['suma_seg'] = df['cantidad'] * df['promedio_seg']
+resumen = df.groupby(['prestador', 'rango'])[['cantidad', 'suma_seg']].sum().reset_index()
+# Promedio ponderado por la cantidad de placas de cada día.
+resumen['Promedio'] = [format_duration(s / c) if c else "00:00:00" for s, c in zip(resumen['suma_seg'], resumen['cantidad'])]
+resumen['Porcentaje'] = (100 * resumen['cantidad'] / resumen['cantidad'].sum()).map('{:.1f}%'.format)
+resumen = resumen.rename(columns={'prestador': 'Prestador', 'rango': 'Rango', 'cantidad': 'Cantidad'})
+df_pivot = resumen.pivot(index='Prestador', columns='Rango', values=['Promedio', 'Cantidad', 'Porcentaje']).fillna(0)
+df_pivot = df_pivot.reindex(columns=RANGOS, level=1)
+st.dataframe(df_pivot, use_container_width=True)
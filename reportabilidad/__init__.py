@@ -0,0 +1 @@
+"""Lógica compartida de los dashboards de Reportabilidad SIMON IV Truper."""
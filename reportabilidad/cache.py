@@ -0,0 +1,139 @@
+"""Caché de resultados direccionada por contenido, en memoria y en disco, compartida entre sesiones.
+
+Streamlit vuelve a ejecutar el script completo en cada interacción y cada navegador abre su propia
+sesión. Los resultados del procesamiento se guardan aquí con una clave derivada del contenido del
+libro (hash), de modo que el mismo archivo se procese una sola vez aunque lo abran varias personas.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "REPORTABILIDAD_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "reportabilidad"),
+)
+
+
+def file_hash(content):
+    """Devuelve el hash SHA-256 (hex) del contenido de un archivo."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def make_key(*parts):
+    """Construye una clave estable a partir del hash del libro, la hoja, las filas, etc."""
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+class ParseCache:
+    """Caché de dos niveles (memoria + disco) con expulsión LRU por tamaño en bytes.
+
+    Los valores deben ser serializables a JSON (dicts de listas, como los datos de cada sección).
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_memory_bytes=64 * 1024**2, max_disk_bytes=512 * 1024**2):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()  # clave -> (tamaño, valor)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _remember(self, key, size, value):
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key)[0]
+        self._memory[key] = (size, value)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, (old_size, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= old_size
+
+    def get(self, key):
+        """Devuelve el valor guardado para `key`, o None si no está en memoria ni en disco."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key][1]
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                payload = f.read()
+            mark_used(path)
+        except OSError:
+            return None
+        value = json.loads(payload)
+        with self._lock:
+            self._remember(key, len(payload), value)
+        return value
+
+    def put(self, key, value):
+        """Guarda `value` en memoria y en disco, expulsando las entradas menos usadas si hace falta."""
+        payload = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        path = self._path(key)
+        with atomic_write(path) as tmp_path, open(tmp_path, "wb") as f:
+            f.write(payload)
+        with self._lock:
+            self._remember(key, len(payload), value)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        evict_oldest(self.directory, ".json", self.max_disk_bytes)
+
+
+@contextmanager
+def atomic_write(path):
+    """Da una ruta temporal donde escribir `path` y, si la escritura termina bien, la reemplaza de una vez.
+
+    La escritura es atómica: otras sesiones (u otros procesos) nunca ven un archivo a medias. Si falla,
+    el temporal se borra y `path` queda como estaba.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def mark_used(path):
+    """Actualiza la fecha de modificación de `path`, que evict_oldest usa como fecha del último uso."""
+    os.utime(path)
+
+
+def evict_oldest(directory, suffix, max_bytes):
+    """Borra los archivos `*suffix` usados hace más tiempo (por mtime) hasta quedar bajo `max_bytes`."""
+    entries = []
+    total = 0
+    for entry in os.scandir(directory):
+        if entry.name.endswith(suffix):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+_parse_cache = None
+_parse_cache_lock = threading.Lock()
+
+
+def get_parse_cache():
+    """Devuelve la caché única del proceso, compartida por todas las sesiones de Streamlit."""
+    global _parse_cache
+    with _parse_cache_lock:
+        if _parse_cache is None:
+            _parse_cache = ParseCache()
+        return _parse_cache
@@ -0,0 +1,94 @@
+"""Configuración de prestadores y rangos de latencia.
+
+Por defecto se usan los dos prestadores y los cuatro rangos de siempre. Para agregar prestadores o
+cambiar los rangos se escribe un JSON (ver reportabilidad.ejemplo.json) en reportabilidad.json, en la
+raíz del repositorio, o en la ruta indicada por la variable REPORTABILIDAD_CONFIG. Las claves que no
+aparezcan en el archivo conservan su valor por defecto.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Secciones (tramos) del recorrido de cada reporte, en el orden de las tablas del Excel.
+SECCIONES = ["AVL a HUB", "HUB a SIMON", "AVL a SIMON"]
+
+CONFIG_PATH = os.environ.get(
+    "REPORTABILIDAD_CONFIG",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reportabilidad.json"),
+)
+
+DEFAULTS = {
+    # Prestadores en el orden en que se muestran.
+    "prestadores": ["AC_avl_Solusof", "AC_avl_Sistech"],
+    # Otros nombres con los que aparece un prestador en los Excel o en los registros crudos.
+    "alias": {"AC_avl_truper": "AC_avl_Sistech", "AC_avl_Sistech_truper": "AC_avl_Sistech"},
+    # Límites entre rangos en segundos: d < 120 -> primer rango, 120 <= d < 300 -> segundo, ...
+    "limites_seg": [120, 300, 600],
+    # Nombres de los rangos (uno más que los límites); si se omiten se generan a partir de los límites.
+    "rangos": ['<2 min', '2-5 min', '5-10 min', '≥10 min'],
+    "colores": {"AC_avl_Solusof": "#0083B8", "AC_avl_Sistech": "#FF4B4B"},
+    # Por encima de esta cantidad de prestadores, los gráficos muestran los principales y agrupan el resto.
+    "max_prestadores_grafico": 8,
+    # Los rangos que terminan antes de este límite cuentan como reportes eficientes.
+    "umbral_eficiencia_seg": 300,
+}
+
+
+def _minutes(seconds):
+    minutes = seconds / 60
+    return f"{minutes:g}"
+
+
+def bucket_labels(limites):
+    """Nombres de los rangos a partir de sus límites: [120, 300] -> ['<2 min', '2-5 min', '≥5 min']."""
+    if not limites:
+        return ['Todos']
+    labels = [f"<{_minutes(limites[0])} min"]
+    labels += [f"{_minutes(a)}-{_minutes(b)} min" for a, b in zip(limites, limites[1:])]
+    labels.append(f"≥{_minutes(limites[-1])} min")
+    return labels
+
+
+def load_config(path=CONFIG_PATH):
+    """Devuelve la configuración efectiva (valores por defecto actualizados con el JSON, si existe)."""
+    config = dict(DEFAULTS)
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            user_config = json.load(f)
+        config.update(user_config)
+        if "limites_seg" in user_config and "rangos" not in user_config:
+            config["rangos"] = bucket_labels(config["limites_seg"])
+    if len(config["rangos"]) != len(config["limites_seg"]) + 1:
+        raise ValueError(f"la configuración tiene {len(config['limites_seg'])} límites pero {len(config['rangos'])} rangos")
+    if list(config["limites_seg"]) != sorted(config["limites_seg"]):
+        raise ValueError("los límites de los rangos deben estar en orden creciente")
+    # Los indicadores de eficiencia suman rangos enteros: el primero y los siguientes hasta el umbral.
+    if config["umbral_eficiencia_seg"] not in list(config["limites_seg"])[1:]:
+        raise ValueError(f"el umbral de eficiencia ({config['umbral_eficiencia_seg']} s) debe ser uno de los límites "
+                         f"de los rangos posteriores al primero: {list(config['limites_seg'])[1:]}")
+    return config
+
+
+CONFIG = load_config()
+
+PROVEEDORES = list(CONFIG["prestadores"])
+ALIAS_PROVEEDORES = dict(CONFIG["alias"])
+RANGOS = list(CONFIG["rangos"])
+LIMITES_RANGOS = np.array(CONFIG["limites_seg"], dtype=float)
+COLORES = dict(CONFIG["colores"])
+MAX_PROVEEDORES_GRAFICO = int(CONFIG["max_prestadores_grafico"])
+UMBRAL_EFICIENCIA_SEG = CONFIG["umbral_eficiencia_seg"]
+# Cantidad de rangos (desde el primero) que quedan por debajo del umbral de eficiencia.
+RANGOS_EFICIENTES = int(np.searchsorted(LIMITES_RANGOS, UMBRAL_EFICIENCIA_SEG, side='right'))
+# Huella de la configuración efectiva: lo que se guarda ya construido con ella (las figuras del
+# histórico) deja de valer cuando cambia.
+HUELLA_CONFIG = hashlib.sha256(json.dumps(CONFIG, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+# Huella de los rangos: los días del histórico guardados con otros rangos no se pueden sumar ni comparar
+# con los actuales (cambiar, por ejemplo, los colores no los invalida).
+HUELLA_RANGOS = hashlib.sha256(json.dumps([RANGOS, CONFIG["limites_seg"]], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+# Referencias contra las que se comparan los indicadores de un día: None es el último día anterior
+# guardado en el histórico y los números, los días de calendario previos que se promedian.
+REFERENCIAS = {"Día anterior": None, "Promedio 7 días": 7, "Promedio 30 días": 30}
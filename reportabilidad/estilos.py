@@ -0,0 +1,23 @@
+"""Idioma de las fechas y estilos compartidos por los dashboards y los reportes HTML sin servidor.
+
+No importa Streamlit, así reportabilidad.render lo usa sin cargarlo; reportabilidad.pagina arma con
+estas reglas los estilos de las páginas de Streamlit.
+"""
+import locale
+
+# --- ESTILOS VISUALES (Inspirado en Power BI) ---
+# Texto negro y en negrita.
+TEXTO = "color: black !important; font-weight: bold !important;"
+# Tarjetas de las métricas (KPIs).
+TARJETA = "border-radius: 10px; background-color: #F0F2F6; padding: 15px; box-shadow: 0 4px 8px 0 rgba(0,0,0,0.2);"
+
+
+def set_spanish_locale():
+    """Nombres de meses y días en español para las fechas (si el sistema no tiene el idioma, se
+    mantiene el predeterminado en lugar de detener el dashboard)."""
+    for nombre in ('es_ES.UTF-8', 'Spanish'):
+        try:
+            locale.setlocale(locale.LC_TIME, nombre)
+            return
+        except locale.Error:
+            continue
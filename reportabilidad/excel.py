@@ -0,0 +1,139 @@
+"""Lectura de las tablas dinámicas de reportabilidad desde los libros de Excel."""
+import datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from reportabilidad.configuracion import ALIAS_PROVEEDORES, PROVEEDORES, RANGOS, SECCIONES
+from reportabilidad.tiempos import annotate, stage
+
+
+def find_table_rows(uploaded_file, sheet_name, expected=len(SECCIONES), anchor="Prestadores"):
+    """Recorre la hoja fila a fila y devuelve las filas de Excel (1-based) donde aparece `anchor`.
+
+    Usa el modo de solo lectura de openpyxl, que no carga la hoja completa en memoria, y se detiene
+    en cuanto encuentra las `expected` tablas.
+    """
+    with stage("detectar_filas"):
+        wb = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+        try:
+            rows = []
+            for row_number, values in enumerate(wb[sheet_name].iter_rows(values_only=True), start=1):
+                if any(isinstance(v, str) and v.strip() == anchor for v in values):
+                    rows.append(row_number)
+                    if len(rows) == expected:
+                        break
+            return rows
+        finally:
+            wb.close()
+
+
+def read_sheet(xls, sheet_name):
+    """Lee la hoja completa una sola vez, sin encabezados, conservando la numeración de filas de Excel."""
+    # Si ya tenemos el libro abierto (pd.ExcelFile) se reutiliza en lugar de volver a abrirlo.
+    if isinstance(xls, pd.ExcelFile):
+        return xls.parse(sheet_name, header=None)
+    return pd.read_excel(xls, sheet_name=sheet_name, header=None, engine='openpyxl')
+
+
+def cell_seconds(value):
+    """Duración en segundos de una celda de 'Promedio de Diferencia' (hora, timedelta o texto)."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return 0.0
+    if isinstance(value, datetime.time):
+        return value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+    if isinstance(value, (datetime.timedelta, pd.Timedelta)):
+        return value.total_seconds()
+    duration = pd.to_timedelta(str(value), errors='coerce')
+    return 0.0 if pd.isna(duration) else duration.total_seconds()
+
+
+# Medidas de la tabla dinámica bajo cada rango.
+MEDIDA_PROMEDIO = "Promedio de Diferencia"
+MEDIDA_CUENTA = "Cuenta de Placas"
+
+
+def _find_column(columns, name):
+    """Columna cuyo nombre es `name` (o, si no hay ninguna exacta, la primera que lo contiene)."""
+    return next((c for c in columns if c == name), None) or next((c for c in columns if name in c), None)
+
+
+def extract_table(raw, start_row):
+    """Extrae de una hoja ya leída la tabla cuyo 'Prestadores' está en la fila `start_row` de Excel."""
+    # El usuario proporciona el número de fila (1-based) de Excel donde aparece "Prestadores".
+    # El encabezado de niveles múltiples se encuentra en esa fila y la anterior.
+    if start_row < 2 or start_row > len(raw):
+        raise ValueError(f"la fila {start_row} está fuera de la hoja (1-{len(raw)})")
+
+    # Las celdas combinadas del rango ('<2 min', ...) solo traen valor en la primera columna.
+    nivel_rango = raw.iloc[start_row - 2].ffill()
+    nivel_medida = raw.iloc[start_row - 1]
+    columnas = ['_'.join(map(str, col)).strip() for col in zip(nivel_rango, nivel_medida)]
+
+    # Las filas de datos van desde la primera fila no vacía hasta la fila vacía o de total que
+    # cierra la tabla, sin importar cuántos prestadores tenga.
+    body = raw.iloc[start_row:]
+    blank = body.isna().all(axis=1).to_numpy()
+    first = int(np.argmin(blank)) if not blank.all() else len(body)
+    body = body.iloc[first:]
+    names = body.iloc[:, 0].astype(str).str.strip()
+    stop = body.isna().all(axis=1).to_numpy() | names.str.lower().str.startswith('total').to_numpy()
+    df = body.iloc[:int(np.argmax(stop)) if stop.any() else len(body)].copy()
+    df.columns = columnas
+    df = df.rename(columns={columnas[0]: 'Prestador'})
+    df['Prestador'] = df['Prestador'].astype(str).str.strip().replace(ALIAS_PROVEEDORES)
+    df = df[df['Prestador'].isin(PROVEEDORES)].drop_duplicates('Prestador').set_index('Prestador')
+
+    # Matrices prestador x rango de cantidades y promedios (en segundos), una columna por rango.
+    # Los rangos de la hoja tienen que ser los configurados: si no, se perderían placas sin aviso.
+    cantidades = np.zeros((len(df), len(RANGOS)), dtype=np.int64)
+    promedios = np.zeros((len(df), len(RANGOS)))
+    usadas = set()
+    for k, rango in enumerate(RANGOS):
+        prom_col = _find_column(df.columns, f"{rango}_{MEDIDA_PROMEDIO}")
+        cant_col = _find_column(df.columns, f"{rango}_{MEDIDA_CUENTA}")
+        for col, medida in ((cant_col, MEDIDA_CUENTA), (prom_col, MEDIDA_PROMEDIO)):
+            if col is None:
+                raise ValueError(f"la tabla no tiene la columna '{rango}_{medida}' del rango configurado '{rango}'")
+        cantidades[:, k] = pd.to_numeric(df[cant_col], errors='coerce').fillna(0).astype(np.int64)
+        promedios[:, k] = [cell_seconds(v) for v in df[prom_col]]
+        usadas.update((cant_col, prom_col))
+    for columna, rango, medida in zip(columnas, nivel_rango, nivel_medida):
+        rango = str(rango).strip()
+        if (str(medida).strip() in (MEDIDA_CUENTA, MEDIDA_PROMEDIO) and not rango.lower().startswith('total')
+                and columna not in usadas):
+            raise ValueError(f"el rango '{rango}' de la hoja no coincide con ningún rango configurado ({', '.join(RANGOS)})")
+    # Se guarda la suma de duraciones (promedio × cantidad) en segundos enteros.
+    segundos = np.rint(promedios * cantidades).astype(np.int64)
+
+    rows = {provider: i for i, provider in enumerate(df.index)}
+    data = {}
+    for provider_name in PROVEEDORES:
+        if provider_name in rows:
+            i = rows[provider_name]
+            data[provider_name] = {"cantidades": cantidades[i].tolist(), "segundos": segundos[i].tolist()}
+        else:
+            data[provider_name] = {"cantidades": [0] * len(RANGOS), "segundos": [0] * len(RANGOS)}
+    return data
+
+
+def parse_sections_from_raw(raw, sheet_name, start_rows):
+    """Devuelve los datos de cada sección de una hoja ya leída (por ejemplo, desde su instantánea).
+
+    `start_rows` es un dict {sección: fila con 'Prestadores'}; el resultado usa las mismas claves.
+    """
+    annotate(hoja=sheet_name, filas_hoja=len(raw), columnas_hoja=raw.shape[1])
+    sections = {}
+    with stage("extraer_tablas"):
+        for section, start_row in start_rows.items():
+            try:
+                sections[section] = extract_table(raw, start_row)
+            except Exception as e:
+                raise ValueError(f"Error al leer la tabla '{section}' en la fila {start_row} de la hoja '{sheet_name}': {e}") from e
+    return sections
+
+
+def parse_table_from_sheet(xls, sheet_name, start_row):
+    """Lee una tabla específica desde una hoja de Excel, comenzando en la fila indicada."""
+    return extract_table(read_sheet(xls, sheet_name), start_row)
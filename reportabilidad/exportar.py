@@ -0,0 +1,209 @@
+"""Exportación del reporte, de un rango de fechas del histórico o de los registros crudos.
+
+Formatos: Excel (una hoja por sección), CSV comprimido con gzip y Parquet (con la sección como
+columna). Los datos llegan como bloques (sección, DataFrame) y cada bloque se escribe y se descarta
+antes de leer el siguiente: CSV se agrega al archivo, Parquet escribe un grupo de filas por bloque con
+ParquetWriter y Excel usa openpyxl en modo write_only, que guarda las filas de cada hoja en archivos
+temporales. Así escribir un mes de registros crudos no necesita más memoria que un bloque.
+
+Para descargarlo por el navegador, el archivo terminado se escribe en un temporal de la carpeta de la
+caché (REPORTABILIDAD_CACHE_DIR) y después pasa entero a memoria, porque Streamlit lo guarda así para
+servirlo. Por eso la descarga tiene un tope (MAX_BYTES_DESCARGA) y los registros crudos en CSV o Excel
+por encima de MAX_FILAS_DESCARGA se escriben directamente en la carpeta de exportaciones del servidor
+(export_to_server), la única donde se permite escribir desde el dashboard.
+"""
+import gzip
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from reportabilidad.cache import DEFAULT_CACHE_DIR
+from reportabilidad.configuracion import LIMITES_RANGOS, PROVEEDORES, RANGOS, SECCIONES
+from reportabilidad.ingesta import COL_PLACA, format_duration, iter_record_chunks, section_durations
+from reportabilidad.modelo import ReportModel
+
+EXPORT_DIR = os.path.join(DEFAULT_CACHE_DIR, "exportaciones")
+# Carpeta del servidor donde se escriben las exportaciones demasiado grandes para descargarlas.
+SERVER_EXPORT_DIR = os.environ.get(
+    "REPORTABILIDAD_EXPORTACIONES",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "datos", "exportaciones"),
+)
+
+# Filas por hoja de Excel (sin el encabezado); las secciones más largas siguen en 'Sección (2)', ...
+MAX_FILAS_EXCEL = 1_048_575
+
+# Tope del archivo que se entrega por el navegador (queda entero en la memoria del servidor).
+MAX_BYTES_DESCARGA = 200 * 1024**2
+# Registros crudos por encima de los cuales CSV y Excel solo se exportan a una ruta del servidor.
+MAX_FILAS_DESCARGA = 1_000_000
+
+COLUMNAS_RESUMEN = ["fecha", "prestador", "rango", "cantidad", "promedio", "promedio_seg"]
+COLUMNAS_REGISTROS = ["placa", "prestador", "inicio", "duracion_seg", "rango"]
+
+
+def report_chunks(sections, fecha):
+    """Bloques del reporte de un día: una fila por prestador y rango de cada sección."""
+    model = ReportModel.from_sections(sections)
+    means = model.means()
+    for j, section in enumerate(model.secciones):
+        rows = [
+            (str(fecha), provider, rango, int(model.cantidades[i, j, k]), format_duration(means[i, j, k]), float(means[i, j, k]))
+            for i, provider in enumerate(model.prestadores)
+            if provider in sections[section]
+            for k, rango in enumerate(model.rangos)
+        ]
+        yield section, pd.DataFrame(rows, columns=COLUMNAS_RESUMEN)
+
+
+def range_chunks(desde, hasta, db_path=None):
+    """Bloques de los días guardados en el histórico entre dos fechas (inclusive), uno por sección."""
+    from reportabilidad.historico import DEFAULT_DB_PATH, load_range
+
+    df = load_range(desde, hasta, db_path or DEFAULT_DB_PATH)
+    df['fecha'] = df['fecha'].astype(str)
+    df['promedio'] = [format_duration(s) for s in df['promedio_seg']]
+    for section in SECCIONES:
+        yield section, df.loc[df['seccion'] == section, COLUMNAS_RESUMEN].reset_index(drop=True)
+
+
+def raw_chunks(sources, chunksize=500_000):
+    """Bloques de registros crudos con la duración y el rango de cada sección.
+
+    Se leen por bloques como en accumulate_records y quedan los mismos reportes que cuentan en el
+    reporte: de los prestadores configurados y con una duración válida en la sección.
+    """
+    for source in sources:
+        name = getattr(source, 'name', None) or str(source)
+        for records, _ in iter_record_chunks(source, name, chunksize):
+            codes, durations, starts = section_durations(records)
+            plates = records[COL_PLACA].astype(str).to_numpy()
+            for j, section in enumerate(SECCIONES):
+                valid = (codes >= 0) & ~np.isnan(durations[j]) & (durations[j] >= 0)
+                yield section, pd.DataFrame({
+                    "placa": plates[valid],
+                    "prestador": np.asarray(PROVEEDORES, dtype=object)[codes[valid]],
+                    # Al segundo, como en el detalle de placas, para que todos los bloques tengan el mismo tipo.
+                    "inicio": np.rint(starts[j, valid]).astype(np.int64).astype('datetime64[s]'),
+                    "duracion_seg": durations[j, valid],
+                    "rango": np.asarray(RANGOS, dtype=object)[np.searchsorted(LIMITES_RANGOS, durations[j, valid], side='right')],
+                }, columns=COLUMNAS_REGISTROS)
+
+
+def raw_rows(sections):
+    """Filas que tendrá la exportación de los registros crudos: los reportes que cuentan en cada sección."""
+    return sum(sum(data["cantidades"]) for section_data in sections.values() for data in section_data.values())
+
+
+def _with_section(section, frame):
+    frame = frame.copy()
+    frame.insert(0, "seccion", section)
+    return frame
+
+
+def write_csv(chunks, handle):
+    """Escribe todos los bloques en un único CSV comprimido con gzip (UTF-8 con BOM, para que Excel
+    lo abra bien una vez descomprimido)."""
+    with gzip.GzipFile(fileobj=handle, mode="wb", compresslevel=6) as comprimido:
+        header = True
+        for section, frame in chunks:
+            _with_section(section, frame).to_csv(comprimido, index=False, header=header,
+                                                 encoding="utf-8-sig" if header else "utf-8")
+            header = False
+        if header:
+            comprimido.write("\ufeffseccion\n".encode("utf-8"))
+
+
+def write_parquet(chunks, handle):
+    """Escribe un grupo de filas de Parquet por bloque; el esquema lo fija el primer bloque con filas."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer, empty = None, None
+    try:
+        for section, frame in chunks:
+            frame = _with_section(section, frame)
+            # En un bloque vacío las columnas de texto no tienen tipo; solo se usa si no hay otro.
+            if frame.empty:
+                empty = frame
+                continue
+            if writer is None:
+                schema = pa.Schema.from_pandas(frame, preserve_index=False)
+                writer = pq.ParquetWriter(handle, schema)
+            writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+        if writer is None and empty is not None:
+            pq.write_table(pa.Table.from_pandas(empty, preserve_index=False), handle)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_excel(chunks, handle):
+    """Escribe una hoja por sección con openpyxl en modo write_only (sin guardar las celdas en memoria)."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheets = {}  # sección -> [hoja actual, filas escritas, número de hoja]
+    for section, frame in chunks:
+        values = frame.astype(object).where(frame.notna(), None)
+        start = 0
+        while start < len(frame) or section not in sheets:
+            if section not in sheets or sheets[section][1] == MAX_FILAS_EXCEL:
+                number = sheets[section][2] + 1 if section in sheets else 1
+                sheet = workbook.create_sheet(section if number == 1 else f"{section} ({number})")
+                sheet.append(list(frame.columns))
+                sheets[section] = [sheet, 0, number]
+            sheet, written, _ = sheets[section]
+            stop = min(len(frame), start + MAX_FILAS_EXCEL - written)
+            for row in values.iloc[start:stop].itertuples(index=False, name=None):
+                sheet.append(row)
+            sheets[section][1] += stop - start
+            start = stop
+    if not sheets:
+        workbook.create_sheet("Sin datos")
+    workbook.save(handle)
+
+
+# nombre -> (extensión, tipo MIME, función que escribe los bloques en un archivo binario)
+FORMATOS = {
+    "Excel": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", write_excel),
+    "CSV": (".csv.gz", "application/gzip", write_csv),
+    "Parquet": (".parquet", "application/vnd.apache.parquet", write_parquet),
+}
+
+
+def export_file(chunks, formato, directory=EXPORT_DIR, max_bytes=MAX_BYTES_DESCARGA):
+    """Escribe los bloques con el formato indicado en un archivo temporal y devuelve su contenido
+    para la descarga.
+
+    Mientras se escribe solo hay un bloque en memoria, pero el archivo terminado se lee entero: si
+    supera `max_bytes` no se lee y se lanza ValueError. El temporal se borra al terminar.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.TemporaryFile(dir=directory) as handle:
+        FORMATOS[formato][2](chunks, handle)
+        if handle.tell() > max_bytes:
+            raise ValueError(f"la exportación ocupa {handle.tell() / 1024**2:,.0f} MB, más que el tope de "
+                             f"{max_bytes / 1024**2:,.0f} MB para descargar; usa Parquet o expórtala a una ruta del servidor")
+        handle.seek(0)
+        return handle.read()
+
+
+def export_to_server(chunks, formato, nombre, directory=SERVER_EXPORT_DIR):
+    """Escribe los bloques en el archivo `nombre` de la carpeta de exportaciones, sin pasar por la memoria.
+
+    Del nombre solo se usa la última parte, y la ruta final (con los enlaces resueltos) tiene que quedar
+    dentro de `directory`; si no, se lanza ValueError. Se escribe de forma atómica: mientras tanto el
+    archivo aparece con la extensión .tmp. Devuelve la ruta escrita.
+    """
+    os.makedirs(directory, exist_ok=True)
+    directory = os.path.realpath(directory)
+    path = os.path.realpath(os.path.join(directory, os.path.basename(nombre)))
+    if os.path.dirname(path) != directory:
+        raise ValueError(f"el archivo '{nombre}' queda fuera de la carpeta de exportaciones {directory}")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as handle:
+        FORMATOS[formato][2](chunks, handle)
+    os.replace(tmp_path, path)
+    return path
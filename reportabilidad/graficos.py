@@ -0,0 +1,359 @@
+"""Construcción de los gráficos y la tabla resumen de cada sección, memorizada por sus datos.
+
+Streamlit vuelve a ejecutar el script en cada interacción; si los datos de una sección no cambiaron,
+se reutilizan el DataFrame, las figuras de Plotly y la tabla pivote ya construidos.
+"""
+import json
+from functools import lru_cache
+from itertools import cycle
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.colors import qualitative
+from plotly.subplots import make_subplots
+
+from reportabilidad.configuracion import (ALIAS_PROVEEDORES, COLORES, LIMITES_RANGOS, MAX_PROVEEDORES_GRAFICO, PROVEEDORES, RANGOS,
+                                          RANGOS_EFICIENTES, UMBRAL_EFICIENCIA_SEG)
+from reportabilidad.cuantiles import CUANTILES, section_quantiles
+from reportabilidad.ingesta import MINUTOS_FRANJA, N_FRANJAS, format_duration
+from reportabilidad.modelo import ReportModel
+from reportabilidad.tiempos import stage
+
+# Colores de las líneas de tendencia de la curva de eficiencia (los demás prestadores usan su color de barra oscurecido).
+COLORES_TENDENCIA = {'AC_avl_Solusof': '#005f87', 'AC_avl_Sistech': '#c43232'}
+# Colores para los prestadores que no tienen uno asignado en la configuración.
+PALETA = qualitative.Plotly
+
+
+def provider_colors(providers):
+    """Color de barra de cada prestador: el de la configuración (o el de su alias) o uno de la paleta."""
+    libres = cycle(c for c in PALETA if c.upper() not in {v.upper() for v in COLORES.values()})
+    return {p: COLORES.get(ALIAS_PROVEEDORES.get(p, p)) or next(libres) for p in providers}
+
+
+def _darken(color, factor=0.75):
+    r, g, b = (int(color[i:i + 2], 16) for i in (1, 3, 5))
+    return f"#{int(r * factor):02x}{int(g * factor):02x}{int(b * factor):02x}"
+
+
+def section_key(section_data):
+    """Representación estable (y hashable) de los datos de una sección."""
+    return json.dumps(section_data, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def build_section_view(section_data, figure_specs=None):
+    """Devuelve lo necesario para mostrar una sección: totales, figuras y tabla resumen.
+
+    Con `figure_specs` ({'fig_cant': json, 'fig_perc': json}, precalculadas por el vigilante de
+    carpetas) las figuras se cargan de su JSON en lugar de construirse.
+    El resultado se comparte entre reruns y sesiones, así que no debe modificarse.
+    """
+    key = section_key(section_data)
+    if figure_specs:
+        return {**_build_section_tables(key), **_figures_from_specs(figure_specs['fig_cant'], figure_specs['fig_perc'])}
+    return _build_section_view(key)
+
+
+def section_figure_specs(section_data):
+    """JSON de las figuras de una sección, para guardarlas ya construidas."""
+    view = build_section_view(section_data)
+    return {'fig_cant': view['fig_cant'].to_json(), 'fig_perc': view['fig_perc'].to_json()}
+
+
+def build_section_frame(section_data, top_n=None):
+    """DataFrame largo (Prestador, Rango, Promedio_seg, Cantidad, Porcentaje) de una sección.
+
+    Con `top_n`, deja los prestadores con más placas y agrupa el resto en una fila 'Otros'.
+    """
+    model = ReportModel.from_section(section_data)
+    return _model_frame(model.collapse(top_n) if top_n else model)
+
+
+def _model_frame(model):
+    n_rangos = len(model.rangos)
+    return pd.DataFrame({
+        'Prestador': np.repeat(model.prestadores, n_rangos),
+        'Rango': np.tile(model.rangos, len(model.prestadores)),
+        'Promedio_seg': model.means().ravel(),
+        'Cantidad': model.cantidades.ravel(),
+        'Porcentaje': model.percentages().ravel(),
+    })
+
+
+def build_section_figures(df):
+    """Gráficos de cantidad y de distribución porcentual por rango."""
+    import plotly.express as px  # se importa recién al construir la primera figura
+
+    colores = provider_colors(df['Prestador'].unique())
+    fig_cant = px.bar(df, x="Rango", y="Cantidad", color="Prestador", barmode="group", text_auto=True, color_discrete_map=colores)
+    fig_cant.update_layout(height=400, plot_bgcolor="rgba(0,0,0,0)", xaxis={'categoryorder':'array', 'categoryarray':RANGOS}, font=dict(color="black", family="Arial Black"), yaxis_title="Nº de Placas")
+
+    fig_perc = px.bar(df, x="Rango", y="Porcentaje", color="Prestador", barmode="group", text_auto='.1f', color_discrete_map=colores)
+    fig_perc.update_layout(height=400, plot_bgcolor="rgba(0,0,0,0)", xaxis={'categoryorder':'array', 'categoryarray':RANGOS}, yaxis=dict(ticksuffix="%"), font=dict(color="black", family="Arial Black"), yaxis_title="% del Total de la Sección")
+    fig_perc.update_traces(texttemplate='%{y:.1f}%')
+    return fig_cant, fig_perc
+
+
+def build_slot_heatmap(section_data, minutos=60):
+    """Mapa de calor franja del día × rango por prestador (solo con datos de registros crudos).
+
+    Cada celda es el % de los reportes de esa franja que cayó en el rango (así se ven las franjas con
+    más demoras aunque tengan menos volumen) y la cantidad de placas aparece al pasar el mouse.
+    `minutos` agrupa las franjas de MINUTOS_FRANJA minutos (15 o 60). Devuelve None si no hay datos.
+    """
+    return _build_slot_heatmap(section_key(section_data), minutos)
+
+
+@lru_cache(maxsize=128)
+def _build_slot_heatmap(key, minutos):
+    section_data = json.loads(key)
+    franjas = {
+        provider: np.asarray(data["franjas"]).reshape(N_FRANJAS, len(RANGOS))
+        for provider, data in section_data.items() if any(data.get("franjas", ()))
+    }
+    if not franjas:
+        return None
+    with stage("mapa_franjas"):
+        # Los prestadores con más placas, como en los demás gráficos.
+        prestadores = sorted(franjas, key=lambda p: -franjas[p].sum())[:MAX_PROVEEDORES_GRAFICO]
+        prestadores.sort(key=list(section_data).index)
+        colores = provider_colors(prestadores)
+        agrupar = minutos // MINUTOS_FRANJA
+        etiquetas = [f"{m // 60:02d}:{m % 60:02d}" for m in range(0, 24 * 60, minutos)]
+        fig = make_subplots(rows=len(prestadores), cols=1, shared_xaxes=True, vertical_spacing=0.08,
+                            subplot_titles=[short_name(p) for p in prestadores])
+        for fila, provider in enumerate(prestadores, start=1):
+            # (franja, rango) -> (rango, franja agrupada)
+            cantidades = franjas[provider].reshape(len(etiquetas), agrupar, len(RANGOS)).sum(axis=1).T
+            totales = cantidades.sum(axis=0, keepdims=True)
+            porcentajes = np.divide(100 * cantidades, totales, out=np.zeros(cantidades.shape), where=totales > 0)
+            fig.add_trace(go.Heatmap(
+                z=porcentajes, x=etiquetas, y=RANGOS, customdata=cantidades, zmin=0, zmax=100, showscale=False,
+                colorscale=[[0, "#FFFFFF"], [1, colores[provider]]], xgap=1, ygap=1,
+                hovertemplate="%{x} · %{y}<br>%{z:.1f}% (%{customdata:,} placas)<extra>" + short_name(provider) + "</extra>",
+            ), row=fila, col=1)
+            fig.update_yaxes(categoryorder='array', categoryarray=RANGOS, autorange='reversed', row=fila, col=1)
+        fig.update_layout(height=120 + 170 * len(prestadores), plot_bgcolor="rgba(0,0,0,0)",
+                          font=dict(color="black", family="Arial Black"), margin=dict(t=60))
+        fig.update_xaxes(title_text="Hora de inicio de la sección", row=len(prestadores), col=1)
+    return fig
+
+
+def build_volume_figure(df, height=500):
+    """Gráfico de volumen de placas por rango y prestador (cantidades ingresadas a mano)."""
+    import plotly.express as px
+
+    fig_cantidades = px.bar(df, x="Rango", y="Cantidad", color="Prestador", barmode="group", text_auto=True,
+                            title="<b>Volumen de Placas Reportadas</b>",
+                            color_discrete_map=provider_colors(df['Prestador'].unique()),
+                            labels={"Cantidad": "Nº de Placas", "Rango": "Rango de Reportabilidad"})
+    fig_cantidades.update_layout(
+        height=height,
+        plot_bgcolor="rgba(0,0,0,0)",
+        xaxis={'categoryorder':'array', 'categoryarray':RANGOS},
+        yaxis=(dict(showgrid=False)),
+        legend_title_text='',
+        font=dict(color="black", family="Arial Black, sans-serif", size=14),
+        title_font_weight="bold",
+        xaxis_title_font_weight="bold",
+        yaxis_title_font_weight="bold"
+    )
+    fig_cantidades.update_traces(textfont=dict(color='black', size=12, family='Arial Black, sans-serif'))
+    return fig_cantidades
+
+
+def build_count_pivot(df):
+    """Tabla resumen (Cantidad y Porcentaje por rango) sin promedios, para las cantidades ingresadas a mano."""
+    df_display = df.copy()
+    df_display['Porcentaje'] = df_display['Porcentaje'].map('{:.1f}%'.format)
+    df_pivot = df_display.pivot(index='Prestador', columns='Rango', values=['Cantidad', 'Porcentaje']).fillna(0)
+    return df_pivot.reindex(columns=RANGOS, level=1)
+
+
+def build_section_pivot(df):
+    """Tabla resumen (Promedio, Cantidad y Porcentaje por rango) de una sección."""
+    df_display = df.copy()
+    # Los promedios se formatean como 'HH:MM:SS' recién al mostrarlos.
+    df_display['Promedio'] = df_display['Promedio_seg'].map(format_duration)
+    df_display['Porcentaje'] = df_display['Porcentaje'].map('{:.1f}%'.format)
+    df_pivot = df_display.pivot(index='Prestador', columns='Rango', values=['Promedio', 'Cantidad', 'Porcentaje']).fillna(0)
+    return df_pivot.reindex(columns=RANGOS, level=1)
+
+
+def build_quantile_table(quantiles_by_provider):
+    """Tabla (Prestador x p50/p95/p99) con los percentiles como 'HH:MM:SS', o None si no hay datos."""
+    if not quantiles_by_provider:
+        return None
+    columnas = [f"p{round(q * 100)}" for q in CUANTILES]
+    tabla = pd.DataFrame.from_dict(quantiles_by_provider, orient='index', columns=columnas)
+    tabla.index.name = 'Prestador'
+    return tabla.map(format_duration)
+
+
+@lru_cache(maxsize=128)
+def _build_section_view(key):
+    tables = _build_section_tables(key)
+    # Las etapas solo se miden cuando la vista no estaba memorizada.
+    with stage("figuras"):
+        fig_cant, fig_perc = build_section_figures(tables['chart_df'])
+    return {**tables, 'fig_cant': fig_cant, 'fig_perc': fig_perc}
+
+
+@lru_cache(maxsize=128)
+def _figures_from_specs(spec_cant, spec_perc):
+    # El JSON lo generó section_figure_specs, así que no se vuelve a validar (es lo que más tarda).
+    with stage("cargar_figuras"):
+        return {'fig_cant': go.Figure(json.loads(spec_cant), _validate=False),
+                'fig_perc': go.Figure(json.loads(spec_perc), _validate=False)}
+
+
+@lru_cache(maxsize=128)
+def _build_section_tables(key):
+    with stage("dataframe_seccion"):
+        model = ReportModel.from_section(json.loads(key))
+        df = _model_frame(model)
+        # Con demasiados prestadores para barras agrupadas, los gráficos muestran los principales
+        # y agrupan el resto; la tabla resumen conserva a todos.
+        chart_df = _model_frame(model.collapse(MAX_PROVEEDORES_GRAFICO)) if len(model.prestadores) > MAX_PROVEEDORES_GRAFICO else df
+    with stage("tabla_pivote"):
+        pivot = build_section_pivot(df)
+        # Solo las secciones calculadas desde registros crudos traen bocetos de cuantiles.
+        cuantiles = build_quantile_table(section_quantiles(json.loads(key)))
+    return {
+        'df': df,
+        'total': int(df['Cantidad'].sum()),
+        'totales': dict(zip(model.prestadores, model.totals()[:, 0].tolist())),
+        'chart_df': chart_df,
+        'pivot': pivot,
+        'cuantiles': cuantiles,
+    }
+
+
+def main_totals(view, n=3):
+    """Los `n` prestadores con más placas de la sección, en el orden de la configuración."""
+    orden = {p: i for i, p in enumerate(PROVEEDORES)}
+    principales = sorted(view['totales'].items(), key=lambda item: -item[1])[:n]
+    return sorted(principales, key=lambda item: orden.get(item[0], len(orden)))
+
+
+def indicator_deltas(section_data, reference):
+    """Diferencias de los indicadores de una sección contra una referencia del histórico.
+
+    `reference` es (n_días, datos de la sección sumados en esos días), como la devuelve
+    historico.reference_totals. Las cantidades se comparan con el promedio diario y las eficiencias,
+    en puntos porcentuales, con el porcentaje del conjunto de esos días. Devuelve
+    {'total': Δ, 'totales': {prestador: Δ}, 'eficiencia': {prestador: (Δ, Δ, Δ)}}; los prestadores
+    sin placas en la referencia no tienen diferencia, y si la referencia no tiene datos de la sección
+    (o es None) no hay ninguna.
+    """
+    if not reference or not reference[1]:
+        return {'total': None, 'totales': {}, 'eficiencia': {}}
+    n_dias, reference_data = reference
+    model = ReportModel.from_section(section_data)
+    ref = ReportModel.from_section(reference_data)
+    ref_totales = dict(zip(ref.prestadores, ref.totals()[:, 0].tolist()))
+    ref_eficiencia = efficiency_indicators(reference_data)
+    return {
+        'total': float(model.cantidades.sum() - ref.cantidades.sum() / n_dias),
+        'totales': {
+            p: float(total - ref_totales[p] / n_dias)
+            for p, total in zip(model.prestadores, model.totals()[:, 0].tolist()) if p in ref_totales
+        },
+        'eficiencia': {
+            p: tuple(a - b for a, b in zip(valores, ref_eficiencia[p]))
+            for p, valores in efficiency_indicators(section_data).items() if p in ref_eficiencia
+        },
+    }
+
+
+def format_delta(value, referencia, unidad=""):
+    """Texto para el `delta` de st.metric: '+120 vs día anterior', '-1.5 pp vs promedio 7 días'."""
+    if value is None:
+        return None
+    numero = f"{value:+.1f}" if unidad else f"{value:+,.0f}"
+    return f"{numero}{' ' + unidad if unidad else ''} vs {referencia.lower()}"
+
+
+def worst_plates_page(worst, page, page_size):
+    """Una página de los reportes más lentos de un prestador ({"placas", "segundos", "inicio"}).
+
+    Solo se arma el DataFrame de las filas visibles, así el navegador no recibe la lista completa.
+    """
+    inicio = (page - 1) * page_size
+    fin = min(inicio + page_size, len(worst["placas"]))
+    segundos = np.asarray(worst["segundos"][inicio:fin])
+    return pd.DataFrame({
+        'Puesto': np.arange(inicio + 1, fin + 1),
+        'Placa': worst["placas"][inicio:fin],
+        'Duración': [format_duration(x) for x in segundos],
+        'Rango': [RANGOS[k] for k in np.searchsorted(LIMITES_RANGOS, segundos, side='right')],
+        'Inicio': worst["inicio"][inicio:fin],
+    })
+
+
+def short_name(provider):
+    """Nombre corto de un prestador: 'AC_avl_Sistech_truper' -> 'Sistech'."""
+    parts = provider.split('_')
+    return parts[2] if len(parts) > 2 and provider.startswith('AC_avl_') else provider
+
+
+def get_eficiencia_emoji(valor):
+    if valor >= 85: return "🟢"
+    if valor >= 70: return "🟡"
+    return "🔴"
+
+
+def efficiency_indicators(section_data):
+    """Porcentaje del total de placas de la sección en el primer rango, en los demás rangos por debajo
+    del umbral de eficiencia y en total (con los rangos por defecto: '<2 min', '2-5 min' y < 5 min).
+
+    Devuelve {prestador: (eficiencia primer rango, eficiencia resto bajo el umbral, total bajo el umbral)}.
+    """
+    model = ReportModel.from_section(section_data)
+    porcentajes = model.percentages()[:, 0]
+    ef1 = porcentajes[:, 0]
+    ef2 = porcentajes[:, 1:RANGOS_EFICIENTES].sum(axis=1)
+    return {p: (float(ef1[i]), float(ef2[i]), float(ef1[i] + ef2[i])) for i, p in enumerate(model.prestadores)}
+
+
+def efficiency_labels():
+    """Nombres de los tres indicadores de efficiency_indicators ('Eficiencia <2 min', 'Eficiencia 2-5 min', 'Total <5 min')."""
+    resto = RANGOS[1] if RANGOS_EFICIENTES == 2 else f"{LIMITES_RANGOS[0] / 60:g}-{UMBRAL_EFICIENCIA_SEG / 60:g} min"
+    return f"Eficiencia {RANGOS[0]}", f"Eficiencia {resto}", f"Total <{UMBRAL_EFICIENCIA_SEG / 60:g} min"
+
+
+def build_efficiency_figure(section_data, height=500):
+    """Curva de eficiencia por prestador: barras con el % de cada rango y su línea de tendencia."""
+    model = ReportModel.from_section(section_data).collapse(MAX_PROVEEDORES_GRAFICO)
+    porcentajes = model.percentages()[:, 0]
+    colores = provider_colors(model.prestadores)
+    series = [
+        (short_name(provider), porcentajes[i].tolist(),
+         (colores[provider], COLORES_TENDENCIA.get(ALIAS_PROVEEDORES.get(provider, provider)) or _darken(colores[provider])))
+        for i, provider in enumerate(model.prestadores)
+    ]
+    fig_eficiencia = go.Figure()
+    for nombre, porcentajes, (bar_color, _) in series:
+        fig_eficiencia.add_trace(go.Bar(x=RANGOS, y=[p / 100.0 for p in porcentajes], name=f'{nombre} (%)', marker_color=bar_color, text=[f'{x:.1f}%' for x in porcentajes], textposition='auto'))
+    for nombre, porcentajes, (_, line_color) in series:
+        fig_eficiencia.add_trace(go.Scatter(x=RANGOS, y=[p / 100.0 for p in porcentajes], name=f'Tendencia {nombre}', mode='lines+markers', line=dict(color=line_color, width=3)))
+    fig_eficiencia.update_layout(
+        height=height,
+        title_text="<b>Curva de Eficiencia por Prestador</b>",
+        xaxis_title="Rango de Reportabilidad",
+        yaxis_title="Porcentaje del Total de Placas",
+        yaxis_tickformat='.0%',
+        barmode='group',
+        plot_bgcolor="rgba(0,0,0,0)",
+        xaxis={'categoryorder':'array', 'categoryarray':RANGOS},
+        legend_title_text='',
+        uniformtext_minsize=8,
+        uniformtext_mode='hide',
+        font=dict(color="black", family="Arial Black, sans-serif", size=14),
+        title_font_weight="bold",
+        xaxis_title_font_weight="bold",
+        yaxis_title_font_weight="bold"
+    )
+    fig_eficiencia.update_traces(textfont=dict(color='black', size=12, family='Arial Black, sans-serif'))
+    return fig_eficiencia
@@ -0,0 +1,349 @@
+"""Histórico local de los resultados diarios, guardado en SQLite e indexado por fecha de análisis.
+
+Cada día procesado se guarda como filas (fecha, sección, prestador, rango, cantidad, promedio en
+segundos), de modo que cualquier rango de fechas se puede consultar sin volver a abrir los Excel.
+Si el día se calculó desde registros crudos, también se guarda el boceto de cuantiles de cada
+sección y prestador, para obtener p50/p95/p99 de cualquier rango de fechas combinándolos.
+
+Además se mantienen sumas acumuladas (cantidad y segundos por sección, prestador y rango hasta cada
+fecha) que se actualizan al guardar cada día. La suma de cualquier ventana de fechas (el día anterior,
+los últimos 7 o 30 días) es la resta de dos acumulados, sin recorrer el histórico.
+"""
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import date, timedelta
+
+import pandas as pd
+
+from reportabilidad.configuracion import HUELLA_CONFIG, HUELLA_RANGOS, REFERENCIAS, SECCIONES
+from reportabilidad.cuantiles import merge
+from reportabilidad.ingesta import RANGOS
+from reportabilidad.modelo import ReportModel, provider_entry
+
+DEFAULT_DB_PATH = os.environ.get(
+    "REPORTABILIDAD_HISTORICO",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "datos", "historico.sqlite"),
+)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS resultados (
+    fecha TEXT NOT NULL,
+    seccion TEXT NOT NULL,
+    prestador TEXT NOT NULL,
+    rango TEXT NOT NULL,
+    cantidad INTEGER NOT NULL,
+    promedio_seg REAL NOT NULL,
+    PRIMARY KEY (fecha, seccion, prestador, rango)
+);
+CREATE INDEX IF NOT EXISTS idx_resultados_prestador ON resultados (prestador, seccion, fecha);
+CREATE TABLE IF NOT EXISTS bocetos (
+    fecha TEXT NOT NULL,
+    seccion TEXT NOT NULL,
+    prestador TEXT NOT NULL,
+    boceto TEXT NOT NULL,
+    PRIMARY KEY (fecha, seccion, prestador)
+);
+CREATE TABLE IF NOT EXISTS figuras (
+    fecha TEXT NOT NULL,
+    seccion TEXT NOT NULL,
+    figura TEXT NOT NULL,
+    spec TEXT NOT NULL,
+    huella TEXT NOT NULL DEFAULT '',  -- HUELLA_CONFIG de la configuración con la que se construyó
+    PRIMARY KEY (fecha, seccion, figura)
+);
+CREATE TABLE IF NOT EXISTS dias (
+    fecha TEXT PRIMARY KEY,
+    n INTEGER NOT NULL  -- cantidad de días guardados hasta esta fecha (inclusive)
+);
+CREATE TABLE IF NOT EXISTS huellas (
+    fecha TEXT PRIMARY KEY,
+    huella TEXT NOT NULL  -- HUELLA_RANGOS de los rangos con los que se guardó el día
+);
+CREATE TABLE IF NOT EXISTS acumulados (
+    fecha TEXT NOT NULL,
+    seccion TEXT NOT NULL,
+    prestador TEXT NOT NULL,
+    rango TEXT NOT NULL,
+    cantidad INTEGER NOT NULL,
+    segundos REAL NOT NULL,
+    PRIMARY KEY (fecha, seccion, prestador, rango)
+);
+"""
+
+# Versión del esquema (PRAGMA user_version); al pasar a la 1 se calculan los acumulados de lo ya guardado,
+# en la 2 las figuras guardan la huella de la configuración y en la 3 cada día, la de sus rangos.
+VERSION_ESQUEMA = 3
+
+
+def connect(db_path=DEFAULT_DB_PATH):
+    """Abre (y crea si hace falta) la base del histórico."""
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.executescript(ESQUEMA)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < VERSION_ESQUEMA:
+        with conn:
+            if version < 1:
+                _rebuild_aggregates(conn)
+            if "huella" not in [r[1] for r in conn.execute("PRAGMA table_info(figuras)")]:
+                # Las figuras ya guardadas quedan sin huella, así que no se vuelven a usar.
+                conn.execute("ALTER TABLE figuras ADD COLUMN huella TEXT NOT NULL DEFAULT ''")
+            if version < 3:
+                _fingerprint_saved_days(conn)
+            conn.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+    return conn
+
+
+def _fingerprint_saved_days(conn):
+    """Asigna la huella de los rangos actuales a los días ya guardados que tienen exactamente esos rangos.
+
+    Los demás quedan sin huella y se tratan como guardados con otra configuración.
+    """
+    por_dia = {}
+    for fecha, rango in conn.execute("SELECT DISTINCT fecha, rango FROM resultados"):
+        por_dia.setdefault(fecha, set()).add(rango)
+    conn.executemany("INSERT OR IGNORE INTO huellas VALUES (?, ?)",
+                     [(fecha, HUELLA_RANGOS) for fecha, rangos in por_dia.items() if rangos == set(RANGOS)])
+
+
+def _check_ranges(conn, desde, hasta):
+    """Lanza ValueError si algún día guardado entre dos fechas (inclusive) usa otros rangos que los actuales."""
+    otros = [r[0] for r in conn.execute(
+        "SELECT d.fecha FROM dias d LEFT JOIN huellas h ON h.fecha = d.fecha "
+        "WHERE d.fecha BETWEEN ? AND ? AND (h.huella IS NULL OR h.huella != ?) ORDER BY d.fecha",
+        (str(desde), str(hasta), HUELLA_RANGOS))]
+    if otros:
+        raise ValueError(f"hay días del histórico guardados con otros rangos que los configurados ({', '.join(RANGOS)}): "
+                         f"{', '.join(otros[:5])}{', ...' if len(otros) > 5 else ''}; vuelve a procesarlos con la configuración actual")
+
+
+def _day_values(conn, fecha):
+    """{(sección, prestador, rango): (cantidad, segundos)} de un día guardado."""
+    return {
+        (section, provider, rango): (cantidad, cantidad * promedio)
+        for section, provider, rango, cantidad, promedio in conn.execute(
+            "SELECT seccion, prestador, rango, cantidad, promedio_seg FROM resultados WHERE fecha = ?", (str(fecha),))
+    }
+
+
+def _rebuild_aggregates(conn):
+    """Recalcula desde cero los acumulados de todos los días guardados."""
+    conn.execute("DELETE FROM dias")
+    conn.execute("DELETE FROM acumulados")
+    fechas = [r[0] for r in conn.execute("SELECT DISTINCT fecha FROM resultados ORDER BY fecha")]
+    acumulado = {}
+    for n, fecha in enumerate(fechas, start=1):
+        for key, (cantidad, segundos) in _day_values(conn, fecha).items():
+            c, s = acumulado.get(key, (0, 0.0))
+            acumulado[key] = (c + cantidad, s + segundos)
+        conn.execute("INSERT INTO dias VALUES (?, ?)", (fecha, n))
+        conn.executemany("INSERT INTO acumulados VALUES (?, ?, ?, ?, ?, ?)",
+                         [(fecha, *key, c, s) for key, (c, s) in acumulado.items()])
+
+
+def _update_aggregates(conn, fecha, anterior, nuevo):
+    """Suma a los acumulados desde `fecha` en adelante la diferencia entre la versión nueva y la
+    anterior del día. Al agregar el último día solo se escriben las filas de esa fecha."""
+    fecha = str(fecha)
+    if conn.execute("SELECT 1 FROM dias WHERE fecha = ?", (fecha,)).fetchone() is None:
+        previo = conn.execute("SELECT fecha, n FROM dias WHERE fecha < ? ORDER BY fecha DESC LIMIT 1", (fecha,)).fetchone()
+        conn.execute("UPDATE dias SET n = n + 1 WHERE fecha > ?", (fecha,))
+        conn.execute("INSERT INTO dias VALUES (?, ?)", (fecha, previo[1] + 1 if previo else 1))
+        if previo:
+            conn.execute("INSERT INTO acumulados SELECT ?, seccion, prestador, rango, cantidad, segundos "
+                         "FROM acumulados WHERE fecha = ?", (fecha, previo[0]))
+    for key in nuevo.keys() | anterior.keys():
+        cantidad, segundos = nuevo.get(key, (0, 0.0))
+        cantidad_ant, segundos_ant = anterior.get(key, (0, 0.0))
+        if cantidad == cantidad_ant and segundos == segundos_ant:
+            continue
+        conn.execute("INSERT OR IGNORE INTO acumulados SELECT fecha, ?, ?, ?, 0, 0 FROM dias WHERE fecha >= ?", (*key, fecha))
+        conn.execute(
+            "UPDATE acumulados SET cantidad = cantidad + ?, segundos = segundos + ? "
+            "WHERE seccion = ? AND prestador = ? AND rango = ? AND fecha >= ?",
+            (cantidad - cantidad_ant, segundos - segundos_ant, *key, fecha),
+        )
+
+
+def save_day(fecha, sections, db_path=DEFAULT_DB_PATH):
+    """Guarda (o reemplaza) los resultados de un día. `sections` es {sección: {prestador: datos}}."""
+    model = ReportModel.from_sections(sections)
+    means = model.means()
+    rows = [
+        (str(fecha), section, provider, rango, int(model.cantidades[i, j, k]), float(means[i, j, k]))
+        for j, section in enumerate(model.secciones)
+        for i, provider in enumerate(model.prestadores)
+        if provider in sections[section]
+        for k, rango in enumerate(model.rangos)
+    ]
+    sketches = [
+        (str(fecha), section, provider, json.dumps(data["boceto"]))
+        for section, section_data in sections.items()
+        for provider, data in section_data.items()
+        if "boceto" in data
+    ]
+    nuevo = {
+        # Igual que en _day_values: sin placas no hay segundos que sumar.
+        (section, provider, rango): (int(model.cantidades[i, j, k]), float(model.cantidades[i, j, k] * means[i, j, k]))
+        for j, section in enumerate(model.secciones)
+        for i, provider in enumerate(model.prestadores)
+        if provider in sections[section]
+        for k, rango in enumerate(model.rangos)
+    }
+    with closing(connect(db_path)) as conn, conn:
+        # Se toma el bloqueo de escritura antes de leer la versión anterior del día: si dos sesiones
+        # guardan la misma fecha a la vez, la segunda espera y ve lo que guardó la primera.
+        conn.execute("BEGIN IMMEDIATE")
+        _update_aggregates(conn, fecha, _day_values(conn, fecha), nuevo)
+        conn.execute("DELETE FROM resultados WHERE fecha = ?", (str(fecha),))
+        conn.execute("DELETE FROM bocetos WHERE fecha = ?", (str(fecha),))
+        # Las figuras precalculadas de la versión anterior del día ya no corresponden.
+        conn.execute("DELETE FROM figuras WHERE fecha = ?", (str(fecha),))
+        conn.executemany("INSERT INTO resultados VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.executemany("INSERT INTO bocetos VALUES (?, ?, ?, ?)", sketches)
+        conn.execute("INSERT OR REPLACE INTO huellas VALUES (?, ?)", (str(fecha), HUELLA_RANGOS))
+
+
+def load_range(desde, hasta, db_path=DEFAULT_DB_PATH):
+    """Devuelve las filas guardadas entre dos fechas (inclusive) como DataFrame.
+
+    Lanza ValueError si alguno de esos días se guardó con otros rangos (ver _check_ranges).
+    """
+    with closing(connect(db_path)) as conn:
+        _check_ranges(conn, desde, hasta)
+        df = pd.read_sql_query(
+            "SELECT * FROM resultados WHERE fecha BETWEEN ? AND ? ORDER BY fecha, rowid",
+            conn, params=(str(desde), str(hasta)),
+        )
+    df['fecha'] = pd.to_datetime(df['fecha']).dt.date
+    return df
+
+
+def load_day(fecha, db_path=DEFAULT_DB_PATH):
+    """Reconstruye los datos de las secciones de un día guardado, o None si no existe.
+
+    Lanza ValueError si el día se guardó con otros rangos.
+    """
+    df = load_range(fecha, fecha, db_path)
+    if df.empty:
+        return None
+    sections = {}
+    for section in SECCIONES:
+        sections[section] = {}
+        for provider, group in df[df['seccion'] == section].groupby('prestador', sort=False):
+            group = group.set_index('rango').reindex(RANGOS).fillna(0)
+            sections[section][provider] = {
+                "cantidades": [int(c) for c in group['cantidad']],
+                "segundos": [int(s) for s in (group['cantidad'] * group['promedio_seg']).round()],
+            }
+    with closing(connect(db_path)) as conn:
+        for section, provider, boceto in conn.execute(
+                "SELECT seccion, prestador, boceto FROM bocetos WHERE fecha = ?", (str(fecha),)):
+            if provider in sections.get(section, {}):
+                sections[section][provider]["boceto"] = json.loads(boceto)
+    return sections
+
+
+def save_figures(fecha, figures, db_path=DEFAULT_DB_PATH):
+    """Guarda (o reemplaza) las figuras ya construidas de un día: {sección: {figura: json de Plotly}}.
+
+    Se guardan con la huella de la configuración actual (colores, rangos, ...) con la que se construyeron.
+    """
+    rows = [(str(fecha), section, name, spec, HUELLA_CONFIG) for section, specs in figures.items() for name, spec in specs.items()]
+    with closing(connect(db_path)) as conn, conn:
+        conn.execute("DELETE FROM figuras WHERE fecha = ?", (str(fecha),))
+        conn.executemany("INSERT INTO figuras VALUES (?, ?, ?, ?, ?)", rows)
+
+
+def load_figures(fecha, db_path=DEFAULT_DB_PATH):
+    """Figuras precalculadas de un día ({sección: {figura: json}}), o {} si no hay o se construyeron
+    con otra configuración."""
+    figures = {}
+    with closing(connect(db_path)) as conn:
+        for section, name, spec in conn.execute("SELECT seccion, figura, spec FROM figuras WHERE fecha = ? AND huella = ?",
+                                                (str(fecha), HUELLA_CONFIG)):
+            figures.setdefault(section, {})[name] = spec
+    return figures
+
+
+def load_sketches(desde, hasta, seccion, prestadores=None, db_path=DEFAULT_DB_PATH):
+    """Combina los bocetos guardados entre dos fechas para una sección.
+
+    Devuelve {prestador: array de conteos}; con `prestadores` se limita a ese grupo.
+    """
+    with closing(connect(db_path)) as conn:
+        rows = conn.execute(
+            "SELECT prestador, boceto FROM bocetos WHERE seccion = ? AND fecha BETWEEN ? AND ?",
+            (seccion, str(desde), str(hasta)),
+        ).fetchall()
+    por_prestador = {}
+    for provider, boceto in rows:
+        if prestadores is None or provider in prestadores:
+            por_prestador.setdefault(provider, []).append(json.loads(boceto))
+    return {provider: merge(bocetos) for provider, bocetos in por_prestador.items()}
+
+
+def available_dates(db_path=DEFAULT_DB_PATH):
+    """Lista las fechas que tienen resultados guardados."""
+    with closing(connect(db_path)) as conn:
+        return [pd.Timestamp(r[0]).date() for r in conn.execute("SELECT DISTINCT fecha FROM resultados ORDER BY fecha")]
+
+
+def _prefix(conn, fecha):
+    """Cantidad de días y acumulados hasta `fecha` (inclusive), desde el último día guardado."""
+    row = conn.execute("SELECT fecha, n FROM dias WHERE fecha <= ? ORDER BY fecha DESC LIMIT 1", (str(fecha),)).fetchone()
+    if row is None:
+        return 0, {}
+    return row[1], {
+        (section, provider, rango): (cantidad, segundos)
+        for section, provider, rango, cantidad, segundos in conn.execute(
+            "SELECT seccion, prestador, rango, cantidad, segundos FROM acumulados WHERE fecha = ?", (row[0],))
+    }
+
+
+def window_totals(desde, hasta, db_path=DEFAULT_DB_PATH):
+    """Suma de los días guardados entre dos fechas (inclusive), como resta de dos acumulados.
+
+    Devuelve (n_días, {sección: {prestador: datos}}) con los prestadores que tienen placas en la ventana.
+    Lanza ValueError si alguno de esos días se guardó con otros rangos (ver _check_ranges).
+    """
+    desde = date.fromisoformat(str(desde))
+    with closing(connect(db_path)) as conn:
+        _check_ranges(conn, desde, hasta)
+        n_hasta, hasta_acum = _prefix(conn, hasta)
+        n_desde, desde_acum = _prefix(conn, desde - timedelta(days=1))
+    ventana = {}
+    for (section, provider, rango), (cantidad, segundos) in hasta_acum.items():
+        cantidad_ant, segundos_ant = desde_acum.get((section, provider, rango), (0, 0.0))
+        ventana.setdefault(section, {}).setdefault(provider, {})[rango] = (cantidad - cantidad_ant, segundos - segundos_ant)
+    sections = {
+        section: {
+            provider: provider_entry([por_rango.get(r, (0, 0))[0] for r in RANGOS], [por_rango.get(r, (0, 0))[1] for r in RANGOS])
+            for provider, por_rango in section_data.items()
+            if any(c for c, _ in por_rango.values())
+        }
+        for section, section_data in ventana.items()
+    }
+    return n_hasta - n_desde, sections
+
+
+def reference_totals(fecha, referencia, db_path=DEFAULT_DB_PATH):
+    """Suma de los días de una de las REFERENCIAS, anteriores a `fecha`; None si no hay días guardados.
+
+    Devuelve (n_días, {sección: {prestador: datos}}); dividiendo por n_días se obtiene el promedio diario.
+    Como window_totals, lanza ValueError si alguno de esos días se guardó con otros rangos.
+    """
+    fecha = date.fromisoformat(str(fecha))
+    dias = REFERENCIAS[referencia]
+    if dias is None:
+        with closing(connect(db_path)) as conn:
+            row = conn.execute("SELECT fecha FROM dias WHERE fecha < ? ORDER BY fecha DESC LIMIT 1", (str(fecha),)).fetchone()
+        if row is None:
+            return None
+        desde = hasta = row[0]
+    else:
+        desde, hasta = fecha - timedelta(days=dias), fecha - timedelta(days=1)
+    n, sections = window_totals(desde, hasta, db_path)
+    return (n, sections) if n else None
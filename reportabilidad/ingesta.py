@@ -0,0 +1,318 @@
+"""Ingesta de los registros crudos de reportes (una fila por reporte) y cálculo de los rangos de latencia.
+
+En lugar de consumir las tablas dinámicas ya agregadas, aquí se calculan las duraciones de cada
+sección a partir de las marcas de tiempo AVL / HUB / SIMON y se agrupan en los rangos
+'<2 min', '2-5 min', '5-10 min' y '≥10 min'. Todo el cálculo se hace por columnas con NumPy,
+sin recorrer los reportes uno por uno.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# Prestadores, alias, rangos y sus límites en segundos salen de la configuración.
+from reportabilidad.configuracion import ALIAS_PROVEEDORES, LIMITES_RANGOS, PROVEEDORES, RANGOS, SECCIONES
+from reportabilidad.cuantiles import N_CASILLEROS, encode, sketch_sections
+
+# Columnas esperadas en la exportación de registros crudos.
+COL_PLACA = "Placa"
+COL_PRESTADOR = "Prestador"
+COL_AVL = "Fecha_AVL"
+COL_HUB = "Fecha_HUB"
+COL_SIMON = "Fecha_SIMON"
+
+# Para cada sección: (marca de inicio, marca de fin).
+TRAMOS_SECCIONES = {
+    "AVL a HUB": (COL_AVL, COL_HUB),
+    "HUB a SIMON": (COL_HUB, COL_SIMON),
+    "AVL a SIMON": (COL_AVL, COL_SIMON),
+}
+
+# Cantidad de reportes más lentos que se conservan por sección y prestador para el detalle de placas.
+TOP_PEORES = 500
+
+# Franjas del día (según la marca de inicio de cada sección) para ver la latencia por hora.
+MINUTOS_FRANJA = 15
+N_FRANJAS = 24 * 60 // MINUTOS_FRANJA
+
+
+def format_duration(seconds):
+    """Convierte segundos a texto 'HH:MM:SS'."""
+    seconds = int(round(seconds))
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def parse_duration(text):
+    """Convierte un texto 'HH:MM:SS' (o cualquier duración que entienda pandas) a segundos."""
+    try:
+        hours, minutes, seconds = str(text).split(':')
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except ValueError:
+        duration = pd.to_timedelta(str(text), errors='coerce')
+        return 0.0 if pd.isna(duration) else duration.total_seconds()
+
+
+def timestamps_to_seconds(column):
+    """Convierte una columna de fechas a segundos (float64), con NaN donde falta la marca."""
+    values = pd.to_datetime(column, errors='coerce').to_numpy(dtype='datetime64[ns]')
+    seconds = values.astype('int64') / 1e9
+    seconds[np.isnat(values)] = np.nan
+    return seconds
+
+
+def provider_codes(column):
+    """Devuelve el índice de cada reporte en PROVEEDORES (-1 si el prestador no interesa)."""
+    # Los alias se resuelven sobre los nombres distintos, no sobre cada reporte.
+    names = pd.Categorical(pd.Series(column, copy=False).astype(str))
+    canonical = [ALIAS_PROVEEDORES.get(name, name) for name in names.categories]
+    lookup = np.append(pd.Index(PROVEEDORES).get_indexer(canonical), -1)
+    return lookup[names.codes].astype(np.int64)
+
+
+def bucket_sections(codes, durations):
+    """Agrupa a la vez varias secciones: `durations` tiene forma (sección, reporte).
+
+    Un único bincount sobre el índice combinado sección × proveedor × rango devuelve dos arrays
+    (sección x proveedor x rango), así que el costo no crece con la cantidad de prestadores.
+    """
+    n_secciones, n_proveedores, n_rangos = len(durations), len(PROVEEDORES), len(RANGOS)
+    section_index = np.broadcast_to(np.arange(n_secciones)[:, np.newaxis], durations.shape)
+    codes = np.broadcast_to(codes, durations.shape)
+    valid = (codes >= 0) & ~np.isnan(durations) & (durations >= 0)
+    durations = durations[valid]
+    flat = ((section_index[valid] * n_proveedores + codes[valid]) * n_rangos
+            + np.searchsorted(LIMITES_RANGOS, durations, side='right'))
+    shape = (n_secciones, n_proveedores, n_rangos)
+    size = n_secciones * n_proveedores * n_rangos
+    counts = np.bincount(flat, minlength=size).reshape(shape)
+    sums = np.bincount(flat, weights=durations, minlength=size).reshape(shape)
+    return counts, sums
+
+
+def slot_sections(codes, durations, starts):
+    """Cantidad de reportes por sección, proveedor, franja del día y rango, con un único bincount.
+
+    `durations` y `starts` (marca de inicio en segundos) tienen forma (sección, reporte); devuelve
+    un array (sección x proveedor x franja x rango).
+    """
+    n_secciones, n_proveedores, n_rangos = len(durations), len(PROVEEDORES), len(RANGOS)
+    section_index = np.broadcast_to(np.arange(n_secciones)[:, np.newaxis], durations.shape)
+    codes = np.broadcast_to(codes, durations.shape)
+    valid = (codes >= 0) & ~np.isnan(durations) & (durations >= 0)
+    slots = (starts[valid] % 86400 // (MINUTOS_FRANJA * 60)).astype(np.int64)
+    flat = (((section_index[valid] * n_proveedores + codes[valid]) * N_FRANJAS + slots) * n_rangos
+            + np.searchsorted(LIMITES_RANGOS, durations[valid], side='right'))
+    shape = (n_secciones, n_proveedores, N_FRANJAS, n_rangos)
+    return np.bincount(flat, minlength=np.prod(shape)).reshape(shape)
+
+
+def to_section_data(counts, sums, sketches=None, slots=None):
+    """Convierte los arrays (proveedor x rango) a la estructura que usa create_section_dashboard.
+
+    Si se indican los bocetos de cuantiles (proveedor x casillero), se agregan en "boceto", y las
+    cantidades por franja del día (proveedor x franja x rango), aplanadas, en "franjas".
+    """
+    data = {
+        provider: {
+            "cantidades": [int(c) for c in counts[i]],
+            "segundos": [int(s) for s in np.rint(sums[i])],
+        }
+        for i, provider in enumerate(PROVEEDORES)
+    }
+    if sketches is not None:
+        for i, provider in enumerate(PROVEEDORES):
+            data[provider]["boceto"] = encode(sketches[i])
+    if slots is not None:
+        for i, provider in enumerate(PROVEEDORES):
+            data[provider]["franjas"] = [int(c) for c in slots[i].ravel()]
+    return data
+
+
+def section_durations(records):
+    """Código de prestador de cada reporte, sus duraciones por sección (sección x reporte) y las
+    marcas de inicio de cada sección (en segundos)."""
+    codes = provider_codes(records[COL_PRESTADOR])
+    marcas = {col: timestamps_to_seconds(records[col]) for col in (COL_AVL, COL_HUB, COL_SIMON)}
+    durations = np.stack([marcas[fin] - marcas[inicio] for inicio, fin in TRAMOS_SECCIONES.values()])
+    starts = np.stack([marcas[inicio] for inicio, _ in TRAMOS_SECCIONES.values()])
+    return codes, durations, starts
+
+
+def compute_section_arrays(records, inputs=None):
+    """Calcula, para cada sección, los arrays de cantidades y sumas de duración (proveedor x rango),
+    los bocetos de cuantiles (proveedor x casillero) y las cantidades por franja del día
+    (proveedor x franja x rango).
+
+    `inputs` es el resultado de section_durations, si ya se calculó.
+    """
+    codes, durations, starts = inputs or section_durations(records)
+    counts, sums = bucket_sections(codes, durations)
+    sketches = sketch_sections(codes, durations, len(PROVEEDORES))
+    slots = slot_sections(codes, durations, starts)
+    return {section: (counts[j], sums[j], sketches[j], slots[j]) for j, section in enumerate(TRAMOS_SECCIONES)}
+
+
+COLUMNAS_REGISTROS = [COL_PLACA, COL_PRESTADOR, COL_AVL, COL_HUB, COL_SIMON]
+EXTENSIONES_REGISTROS = ('.csv', '.parquet', '.xlsx')
+# Única carpeta del servidor (con sus subcarpetas) desde la que el dashboard lee exportaciones de registros.
+RAW_DATA_DIR = os.environ.get(
+    "REPORTABILIDAD_REGISTROS",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "datos", "registros"),
+)
+
+
+def raw_data_files(carpeta, root=RAW_DATA_DIR):
+    """Archivos de registros de `carpeta`, una ruta relativa a `root`.
+
+    Con los enlaces resueltos, la carpeta y cada archivo tienen que quedar dentro de `root`; si la
+    carpeta queda fuera o no existe se lanza ValueError. Devuelve (carpeta real, rutas ordenadas).
+    """
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, carpeta))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"la carpeta '{carpeta}' queda fuera de {root}")
+    if not os.path.isdir(path):
+        raise ValueError(f"la carpeta '{carpeta}' no existe en {root}")
+    paths = (os.path.realpath(os.path.join(path, f)) for f in os.listdir(path) if f.lower().endswith(EXTENSIONES_REGISTROS))
+    return path, sorted(p for p in paths if os.path.commonpath([root, p]) == root and os.path.isfile(p))
+
+
+def read_records(uploaded_file, file_name=None):
+    """Lee un archivo de registros crudos (CSV, Parquet o Excel) con las columnas necesarias."""
+    file_name = (file_name or getattr(uploaded_file, 'name', None) or str(uploaded_file)).lower()
+    if file_name.endswith('.parquet'):
+        return pd.read_parquet(uploaded_file, columns=COLUMNAS_REGISTROS)
+    if file_name.endswith('.xlsx'):
+        return pd.read_excel(uploaded_file, usecols=COLUMNAS_REGISTROS, engine='openpyxl')
+    return pd.read_csv(uploaded_file, usecols=COLUMNAS_REGISTROS)
+
+
+def iter_record_chunks(source, file_name=None, chunksize=500_000):
+    """Lee un archivo de registros en bloques de `chunksize` filas (grupos de filas en Parquet).
+
+    Devuelve tuplas (bloque, fracción leída del archivo) para poder informar el progreso.
+    Excel no admite lectura por bloques y se entrega en un único bloque.
+    """
+    file_name = (file_name or getattr(source, 'name', None) or str(source)).lower()
+    if file_name.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(source)
+        total_rows = max(parquet_file.metadata.num_rows, 1)
+        rows_read = 0
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=COLUMNAS_REGISTROS):
+            rows_read += batch.num_rows
+            yield batch.to_pandas(), rows_read / total_rows
+    elif file_name.endswith('.xlsx'):
+        yield read_records(source, file_name), 1.0
+    else:
+        opened = isinstance(source, (str, bytes)) or hasattr(source, '__fspath__')
+        handle = open(source, 'rb') if opened else source
+        try:
+            handle.seek(0, 2)
+            total_bytes = max(handle.tell(), 1)
+            handle.seek(0)
+            for chunk in pd.read_csv(handle, usecols=COLUMNAS_REGISTROS, chunksize=chunksize):
+                yield chunk, min(handle.tell() / total_bytes, 1.0)
+        finally:
+            if opened:
+                handle.close()
+
+
+class WorstReports:
+    """Los `top_k` reportes más lentos de cada sección y prestador, actualizados bloque a bloque.
+
+    Cada bloque se filtra primero contra la duración del k-ésimo peor reporte ya conservado de su
+    prestador y los candidatos se eligen con np.argpartition, sin ordenar todos los reportes.
+    """
+
+    def __init__(self, top_k=TOP_PEORES):
+        self.top_k = top_k
+        # (sección, código de prestador) -> (duraciones, placas, inicios)
+        self.kept = {}
+        self.thresholds = np.full((len(SECCIONES), len(PROVEEDORES)), -np.inf)
+
+    def update(self, codes, durations, starts, plates):
+        """Agrega un bloque: `durations` y `starts` tienen forma (sección, reporte)."""
+        for j in range(len(durations)):
+            valid = codes >= 0
+            threshold = self.thresholds[j, np.where(valid, codes, 0)]
+            candidates = np.flatnonzero(valid & (durations[j] >= 0) & (durations[j] > threshold))
+            if len(candidates) == 0:
+                continue
+            candidate_codes = codes[candidates]
+            for i in np.flatnonzero(np.bincount(candidate_codes, minlength=len(PROVEEDORES))):
+                rows = candidates[candidate_codes == i]
+                merged = [durations[j, rows], plates[rows], starts[j, rows]]
+                if (j, i) in self.kept:
+                    merged = [np.concatenate(pair) for pair in zip(self.kept[(j, i)], merged)]
+                if len(merged[0]) > self.top_k:
+                    keep = np.argpartition(-merged[0], self.top_k - 1)[:self.top_k]
+                    merged = [values[keep] for values in merged]
+                    self.thresholds[j, i] = merged[0].min()
+                self.kept[(j, i)] = merged
+
+    def result(self):
+        """{sección: {prestador: {"placas", "segundos", "inicio"}}}, de mayor a menor duración."""
+        result = {section: {} for section in SECCIONES}
+        for (j, i), (duraciones, placas, inicios) in self.kept.items():
+            orden = np.argsort(-duraciones, kind='stable')
+            result[SECCIONES[j]][PROVEEDORES[i]] = {
+                "placas": [str(p) for p in placas[orden]],
+                "segundos": [float(d) for d in duraciones[orden]],
+                "inicio": pd.to_datetime(inicios[orden], unit='s').strftime('%Y-%m-%d %H:%M:%S').tolist(),
+            }
+        return result
+
+
+class RecordAccumulator:
+    """Totales acumulados por sección, proveedor y rango (cantidades, suma de duraciones y bocetos de cuantiles).
+
+    Solo guarda unos pocos arrays pequeños y los TOP_PEORES reportes más lentos de cada sección y
+    prestador, así que la memoria no depende del volumen procesado.
+    """
+
+    def __init__(self, top_k=TOP_PEORES):
+        shape = (len(PROVEEDORES), len(RANGOS))
+        self.counts = {section: np.zeros(shape, dtype=np.int64) for section in SECCIONES}
+        self.sums = {section: np.zeros(shape, dtype=np.float64) for section in SECCIONES}
+        self.sketches = {section: np.zeros((len(PROVEEDORES), N_CASILLEROS), dtype=np.int64) for section in SECCIONES}
+        self.slots = {section: np.zeros((len(PROVEEDORES), N_FRANJAS, len(RANGOS)), dtype=np.int64) for section in SECCIONES}
+        self.worst = WorstReports(top_k)
+        self.rows = 0
+
+    def update(self, records):
+        """Suma un bloque de registros crudos a los totales."""
+        inputs = section_durations(records)
+        for section, (counts, sums, sketches, slots) in compute_section_arrays(records, inputs).items():
+            self.counts[section] += counts
+            self.sums[section] += sums
+            self.sketches[section] += sketches
+            self.slots[section] += slots
+        codes, durations, starts = inputs
+        self.worst.update(codes, durations, starts, records[COL_PLACA].to_numpy())
+        self.rows += len(records)
+
+    def sections(self):
+        """Devuelve los datos de las tres secciones con el formato de create_section_dashboard."""
+        return {
+            section: to_section_data(self.counts[section], self.sums[section], self.sketches[section], self.slots[section])
+            for section in SECCIONES
+        }
+
+
+def accumulate_records(sources, chunksize=500_000, progress=None):
+    """Procesa uno o varios archivos de registros por bloques y devuelve el RecordAccumulator con los
+    totales de las secciones (accumulator.sections()) y los peores reportes (accumulator.worst).
+
+    `sources` es una lista de rutas o archivos subidos. Si se indica `progress`, se llama como
+    progress(fracción_total, mensaje) después de cada bloque.
+    """
+    accumulator = RecordAccumulator()
+    for i, source in enumerate(sources):
+        name = getattr(source, 'name', None) or str(source)
+        for chunk, fraction in iter_record_chunks(source, name, chunksize):
+            accumulator.update(chunk)
+            if progress is not None:
+                progress((i + fraction) / len(sources), f"{name}: {accumulator.rows:,} registros procesados")
+    return accumulator
@@ -0,0 +1,123 @@
+"""Instantáneas en Parquet de las hojas leídas y lectores de Excel intercambiables.
+
+Leer un .xlsx con openpyxl es lo más lento de todo el procesamiento. La primera lectura correcta de
+cada hoja se guarda como Parquet, con el hash del contenido del libro como clave. Las lecturas
+siguientes del mismo libro (por ejemplo, con otras filas 'Prestadores') cargan la instantánea en
+lugar del Excel.
+
+El lector de Excel se elige por nombre. Por defecto se usa 'calamine' si python-calamine está
+instalado y, si no, 'openpyxl'. La variable REPORTABILIDAD_LECTOR_EXCEL fija uno en particular.
+Se pueden registrar otros lectores con register_reader().
+"""
+import hashlib
+import importlib.util
+import os
+
+import pandas as pd
+
+from reportabilidad.cache import DEFAULT_CACHE_DIR, atomic_write, evict_oldest, mark_used
+from reportabilidad.tiempos import stage
+
+SNAPSHOT_DIR = os.path.join(DEFAULT_CACHE_DIR, "hojas")
+MAX_SNAPSHOT_BYTES = 256 * 1024**2
+
+# nombre -> (función(source, sheet_name) -> DataFrame sin encabezados, módulo que requiere, engine de pandas)
+LECTORES = {}
+
+
+def register_reader(name, read, module=None, engine=None):
+    """Registra un lector de hojas; `module` es el paquete que debe estar instalado para usarlo."""
+    LECTORES[name] = (read, module, engine)
+
+
+def _pandas_reader(engine):
+    def read(source, sheet_name):
+        # Si el libro ya está abierto con el mismo motor se reutiliza en lugar de volver a abrirlo.
+        if isinstance(source, pd.ExcelFile) and source.engine == engine:
+            return source.parse(sheet_name, header=None)
+        return pd.read_excel(source, sheet_name=sheet_name, header=None, engine=engine)
+    return read
+
+
+register_reader("openpyxl", _pandas_reader("openpyxl"), "openpyxl", "openpyxl")
+register_reader("calamine", _pandas_reader("calamine"), "python_calamine", "calamine")
+
+
+def available_readers():
+    """Nombres de los lectores registrados cuyas dependencias están instaladas."""
+    return [name for name, (_, module, _) in LECTORES.items() if module is None or importlib.util.find_spec(module)]
+
+
+def default_reader():
+    """Lector a usar cuando no se indica ninguno."""
+    disponibles = available_readers()
+    elegido = os.environ.get("REPORTABILIDAD_LECTOR_EXCEL")
+    if elegido:
+        if elegido not in disponibles:
+            raise ValueError(f"el lector de Excel '{elegido}' no está disponible (disponibles: {', '.join(disponibles)})")
+        return elegido
+    return "calamine" if "calamine" in disponibles else "openpyxl"
+
+
+def open_workbook(source, reader=None):
+    """Abre el libro como pd.ExcelFile con el motor del lector (para listar hojas y reutilizarlo)."""
+    engine = LECTORES[reader or default_reader()][2]
+    return pd.ExcelFile(source, engine=engine)
+
+
+def read_sheet_with(source, sheet_name, reader=None):
+    """Lee la hoja completa, sin encabezados, con el lector indicado."""
+    return LECTORES[reader or default_reader()][0](source, sheet_name)
+
+
+def snapshot_path(content_hash, sheet_name, directory=SNAPSHOT_DIR):
+    sheet_id = hashlib.sha256(str(sheet_name).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(directory, f"{content_hash}_{sheet_id}.parquet")
+
+
+def _to_snapshot(raw):
+    """Hoja apta para Parquet: las columnas con tipos mezclados (texto, horas, números) pasan a texto."""
+    snapshot = raw.copy()
+    for col in snapshot.columns:
+        if snapshot[col].dtype == object:
+            values = snapshot[col]
+            snapshot[col] = values.map(str).where(values.notna(), None)
+    snapshot.columns = [str(c) for c in snapshot.columns]
+    return snapshot
+
+
+def _from_snapshot(snapshot):
+    snapshot.columns = range(snapshot.shape[1])
+    return snapshot
+
+
+def write_snapshot(raw, path):
+    """Escribe la instantánea y expulsa las más viejas si el directorio supera MAX_SNAPSHOT_BYTES."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_write(path) as tmp_path:
+        _to_snapshot(raw).to_parquet(tmp_path, index=False)
+    evict_oldest(os.path.dirname(path), ".parquet", MAX_SNAPSHOT_BYTES)
+
+
+def read_sheet_snapshot(source, sheet_name, content_hash, reader=None, directory=SNAPSHOT_DIR):
+    """Devuelve la hoja desde su instantánea si existe; si no, la lee del Excel y guarda la instantánea.
+
+    Sin pyarrow instalado (o si la instantánea no se puede escribir) la hoja se lee siempre del Excel.
+    """
+    path = snapshot_path(content_hash, sheet_name, directory)
+    if os.path.exists(path):
+        try:
+            with stage("leer_instantanea"):
+                raw = _from_snapshot(pd.read_parquet(path))
+            mark_used(path)
+            return raw
+        except (OSError, ImportError, TypeError, ValueError):
+            pass
+    with stage("leer_hoja"):
+        raw = read_sheet_with(source, sheet_name, reader)
+    try:
+        with stage("escribir_instantanea"):
+            write_snapshot(raw, path)
+    except (OSError, ImportError, TypeError, ValueError):
+        pass
+    return raw
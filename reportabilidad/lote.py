@@ -0,0 +1,194 @@
+"""Procesamiento en lote de muchos libros diarios (o de todas las hojas de un libro) en paralelo.
+
+La lectura con openpyxl usa un solo núcleo, así que cada hoja se procesa en un proceso aparte de un
+ProcessPoolExecutor. El resultado es un único conjunto de datos de varios días, con el error de cada
+archivo informado por separado en lugar de cortar todo el lote.
+
+Uso desde la línea de comandos:
+
+    python -m reportabilidad.lote carpeta_o_archivos... --salida resultados.csv [--todas-las-hojas]
+"""
+import argparse
+import glob
+import io
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+import pandas as pd
+
+from reportabilidad.cache import file_hash
+from reportabilidad.excel import SECCIONES, find_table_rows, parse_sections_from_raw
+from reportabilidad.ingesta import format_duration
+from reportabilidad.instantaneas import open_workbook, read_sheet_snapshot
+from reportabilidad.modelo import ReportModel
+
+# Fechas en el nombre del archivo o de la hoja: 2025-08-18, 2025_08_18, 20250818, 18-08-2025, 18.08.2025
+PATRONES_FECHA = [
+    (re.compile(r"(20\d{2})[-_.]?(\d{2})[-_.]?(\d{2})"), (1, 2, 3)),
+    (re.compile(r"(\d{2})[-_.](\d{2})[-_.](20\d{2})"), (3, 2, 1)),
+]
+
+
+def infer_date(text):
+    """Intenta deducir la fecha del análisis a partir de un nombre de archivo u hoja."""
+    for pattern, (y, m, d) in PATRONES_FECHA:
+        for match in pattern.finditer(text):
+            try:
+                return date(int(match.group(y)), int(match.group(m)), int(match.group(d)))
+            except ValueError:
+                continue
+    return None
+
+
+def list_sheets(source):
+    """Devuelve los nombres de las hojas de un libro (ruta o bytes)."""
+    with open_workbook(io.BytesIO(source) if isinstance(source, bytes) else source) as xls:
+        return xls.sheet_names
+
+
+def process_sheet(name, source, sheet_name=None, start_rows=None):
+    """Procesa una hoja de un libro; pensado para ejecutarse dentro de un proceso del pool.
+
+    Si no se indica la hoja se usa la primera; si no se indican las filas se detectan las filas con
+    'Prestadores'. Devuelve un dict (serializable a JSON) con el archivo, la hoja, la fecha deducida
+    en formato ISO, las secciones y el error.
+    """
+    result = {"archivo": name, "hoja": sheet_name, "fecha": None, "secciones": None, "error": None}
+    try:
+        if isinstance(source, bytes):
+            data = source
+        else:
+            with open(source, "rb") as f:
+                data = f.read()
+        with open_workbook(io.BytesIO(data)) as xls:
+            sheet_name = sheet_name or xls.sheet_names[0]
+            result["hoja"] = sheet_name
+            if start_rows is None:
+                rows = find_table_rows(io.BytesIO(data), sheet_name)
+                if len(rows) != len(SECCIONES):
+                    raise ValueError(f"solo se encontraron {len(rows)} de {len(SECCIONES)} tablas con 'Prestadores'")
+                start_rows = dict(zip(SECCIONES, rows))
+            # Volver a procesar el mismo libro (otra corrida del lote, otras filas) lee su instantánea.
+            raw = read_sheet_snapshot(xls, sheet_name, file_hash(data))
+            result["secciones"] = parse_sections_from_raw(raw, sheet_name, start_rows)
+        fecha = infer_date(sheet_name) or infer_date(os.path.basename(name))
+        result["fecha"] = fecha.isoformat() if fecha else None
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def build_jobs(files, sheet_name=None, all_sheets=False):
+    """Arma la lista de trabajos (nombre, origen, hoja) a partir de pares (nombre, ruta o bytes)."""
+    jobs = []
+    for name, source in files:
+        if all_sheets:
+            try:
+                jobs.extend((name, source, sheet) for sheet in list_sheets(source))
+            except Exception:
+                jobs.append((name, source, None))  # el error se informará al procesarlo
+        else:
+            jobs.append((name, source, sheet_name))
+    return jobs
+
+
+def process_batch(jobs, start_rows=None, max_workers=None, progress=None):
+    """Procesa los trabajos en un pool de procesos y devuelve los resultados en el orden recibido.
+
+    Si se indica `progress`, se llama como progress(terminados, total) al completar cada trabajo.
+    """
+    results = [None] * len(jobs)
+    # 'spawn' evita heredar los hilos del servidor de Streamlit al crear los procesos.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        # Los procesos nuevos importan el __main__ del proceso como __mp_main__: con `streamlit run` es
+        # la CLI de Streamlit, protegida por `if __name__ == "__main__"`, así que no se vuelve a ejecutar
+        # el dashboard.
+        futures = {
+            pool.submit(process_sheet, name, source, sheet, start_rows): i
+            for i, (name, source, sheet) in enumerate(jobs)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            if progress is not None:
+                progress(done, len(jobs))
+    return results
+
+
+def results_to_frame(results):
+    """Une los resultados correctos en un DataFrame largo de varios días (una fila por rango)."""
+    rows = []
+    for r in results:
+        if not r["secciones"]:
+            continue
+        model = ReportModel.from_sections(r["secciones"])
+        means = model.means()
+        rows.extend(
+            {
+                "fecha": r["fecha"], "archivo": r["archivo"], "hoja": r["hoja"], "seccion": section,
+                "prestador": provider, "rango": rango, "cantidad": int(model.cantidades[i, j, k]),
+                "promedio": format_duration(means[i, j, k]), "promedio_seg": float(means[i, j, k]),
+            }
+            for j, section in enumerate(model.secciones)
+            for i, provider in enumerate(model.prestadores)
+            for k, rango in enumerate(model.rangos)
+        )
+    return pd.DataFrame(rows, columns=["fecha", "archivo", "hoja", "seccion", "prestador", "rango",
+                                       "cantidad", "promedio", "promedio_seg"])
+
+
+def expand_paths(paths):
+    """Expande carpetas y comodines a la lista de libros .xlsx."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.xlsx"))))
+        else:
+            files.extend(sorted(glob.glob(path)) or [path])
+    return [f for f in files if not os.path.basename(f).startswith("~$")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Procesa en paralelo libros de reportabilidad.")
+    parser.add_argument("rutas", nargs="+", help="Libros .xlsx, carpetas o comodines.")
+    parser.add_argument("--hoja", help="Hoja a leer en cada libro (por defecto, la primera).")
+    parser.add_argument("--todas-las-hojas", action="store_true", help="Procesa todas las hojas de cada libro.")
+    parser.add_argument("--filas", nargs=3, type=int, metavar=("AVL_HUB", "HUB_SIMON", "AVL_SIMON"),
+                        help="Filas con 'Prestadores' (por defecto se detectan automáticamente).")
+    parser.add_argument("--procesos", type=int, default=None, help="Cantidad de procesos (por defecto, todos los núcleos).")
+    parser.add_argument("--salida", default="resultados_lote.csv", help="Archivo CSV con el conjunto de datos resultante.")
+    parser.add_argument("--historico", action="store_true", help="Guarda cada día en el histórico local.")
+    args = parser.parse_args(argv)
+
+    files = [(path, path) for path in expand_paths(args.rutas)]
+    jobs = build_jobs(files, args.hoja, args.todas_las_hojas)
+    start_rows = dict(zip(SECCIONES, args.filas)) if args.filas else None
+    results = process_batch(jobs, start_rows, args.procesos,
+                            progress=lambda done, total: print(f"\r{done}/{total} hojas procesadas", end="", file=sys.stderr))
+    print(file=sys.stderr)
+
+    for r in results:
+        if r["error"]:
+            print(f"ERROR {r['archivo']} [{r['hoja']}]: {r['error']}", file=sys.stderr)
+        elif r["fecha"] is None:
+            print(f"AVISO {r['archivo']} [{r['hoja']}]: no se pudo deducir la fecha", file=sys.stderr)
+
+    results_to_frame(results).to_csv(args.salida, index=False)
+    if args.historico:
+        from reportabilidad.historico import save_day
+
+        for r in results:
+            if r["secciones"] and r["fecha"]:
+                save_day(r["fecha"], r["secciones"])
+
+    failed = sum(1 for r in results if r["error"])
+    print(f"{len(results) - failed} hojas correctas, {failed} con error. Resultados en {args.salida}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Modelo numérico de los resultados: arrays prestador × sección × rango.
+
+Cada sección se guarda como cantidades de placas y sumas de duraciones en segundos enteros, de modo
+que los promedios ponderados, totales y porcentajes de varios prestadores, secciones o días se
+calculan con NumPy sin volver a interpretar texto. El formato 'HH:MM:SS' solo se genera al mostrar.
+
+Los datos de una sección viajan (caché, histórico, procesos del lote) como
+{prestador: {"cantidades": [int], "segundos": [int]}}; ReportModel los convierte a arrays.
+"""
+import numpy as np
+
+from reportabilidad.configuracion import SECCIONES
+from reportabilidad.ingesta import RANGOS, format_duration, parse_duration
+
+
+def provider_entry(cantidades, segundos):
+    """Datos de un prestador en una sección: cantidades y suma de duraciones (segundos) por rango."""
+    return {"cantidades": [int(c) for c in cantidades], "segundos": [int(round(s)) for s in segundos]}
+
+
+def entry_seconds(data):
+    """Suma de duraciones por rango de un prestador.
+
+    Acepta también el formato anterior con promedios 'HH:MM:SS' (entradas manuales o cachés viejas).
+    """
+    if "segundos" in data:
+        return data["segundos"]
+    if "promedios" in data:
+        return [int(round(parse_duration(p) * c)) for p, c in zip(data["promedios"], data["cantidades"])]
+    return [0] * len(data["cantidades"])
+
+
+class ReportModel:
+    """Cantidades y sumas de duraciones (int64) con forma (prestador, sección, rango)."""
+
+    def __init__(self, prestadores, cantidades, segundos, secciones=SECCIONES, rangos=RANGOS):
+        self.prestadores = list(prestadores)
+        self.secciones = list(secciones)
+        self.rangos = list(rangos)
+        shape = (len(self.prestadores), len(self.secciones), len(self.rangos))
+        self.cantidades = np.asarray(cantidades, dtype=np.int64).reshape(shape)
+        self.segundos = np.asarray(segundos, dtype=np.int64).reshape(shape)
+
+    @classmethod
+    def from_sections(cls, sections, rangos=RANGOS):
+        """Construye el modelo desde {sección: {prestador: datos}}; los prestadores faltantes quedan en cero."""
+        secciones = list(sections)
+        prestadores = list(dict.fromkeys(p for section_data in sections.values() for p in section_data))
+        shape = (len(prestadores), len(secciones), len(rangos))
+        cantidades = np.zeros(shape, dtype=np.int64)
+        segundos = np.zeros(shape, dtype=np.int64)
+        index = {p: i for i, p in enumerate(prestadores)}
+        for j, section_data in enumerate(sections.values()):
+            for provider, data in section_data.items():
+                cantidades[index[provider], j] = data["cantidades"]
+                segundos[index[provider], j] = entry_seconds(data)
+        return cls(prestadores, cantidades, segundos, secciones, rangos)
+
+    @classmethod
+    def from_section(cls, section_data, section="Sección", rangos=RANGOS):
+        """Modelo de una sola sección a partir de {prestador: datos}."""
+        return cls.from_sections({section: section_data}, rangos)
+
+    def section(self, section):
+        """Submodelo con una sola sección."""
+        j = self.secciones.index(section)
+        return ReportModel(self.prestadores, self.cantidades[:, j:j + 1], self.segundos[:, j:j + 1], [section], self.rangos)
+
+    def collapse(self, top_n, otros="Otros"):
+        """Deja los `top_n` prestadores con más placas y suma el resto en una fila `otros`."""
+        if len(self.prestadores) <= top_n:
+            return self
+        orden = np.argsort(-self.cantidades.sum(axis=(1, 2)), kind='stable')
+        top, resto = np.sort(orden[:top_n]), orden[top_n:]
+        prestadores = [self.prestadores[i] for i in top] + [f"{otros} ({len(resto)})"]
+        cantidades = np.concatenate([self.cantidades[top], self.cantidades[resto].sum(axis=0, keepdims=True)])
+        segundos = np.concatenate([self.segundos[top], self.segundos[resto].sum(axis=0, keepdims=True)])
+        return ReportModel(prestadores, cantidades, segundos, self.secciones, self.rangos)
+
+    def totals(self, axis=2):
+        """Cantidad total sumando sobre `axis` (por defecto los rangos: prestador × sección)."""
+        return self.cantidades.sum(axis=axis)
+
+    def means(self, axis=None):
+        """Promedio ponderado en segundos; si se indica `axis`, agrupando (sumando) sobre ese eje."""
+        cantidades, segundos = self.cantidades, self.segundos
+        if axis is not None:
+            cantidades, segundos = cantidades.sum(axis=axis), segundos.sum(axis=axis)
+        return np.divide(segundos, cantidades, out=np.zeros(cantidades.shape), where=cantidades > 0)
+
+    def percentages(self):
+        """Porcentaje de cada prestador y rango sobre el total de placas de su sección."""
+        totales = self.cantidades.sum(axis=(0, 2), keepdims=True)
+        return np.divide(100 * self.cantidades, totales, out=np.zeros(self.cantidades.shape), where=totales > 0)
+
+    def formatted_means(self):
+        """Promedios como texto 'HH:MM:SS', para mostrar."""
+        return np.vectorize(format_duration, otypes=[object])(self.means())
+
+    def to_sections(self):
+        """Vuelve al formato {sección: {prestador: {"cantidades", "segundos"}}}."""
+        return {
+            section: {
+                provider: provider_entry(self.cantidades[i, j], self.segundos[i, j])
+                for i, provider in enumerate(self.prestadores)
+            }
+            for j, section in enumerate(self.secciones)
+        }
@@ -0,0 +1,51 @@
+"""Configuración común de las páginas de Streamlit: idioma de las fechas, set_page_config y estilos.
+
+Los dashboards importan este módulo y reportabilidad.configuracion al comenzar, que solo dependen de
+Streamlit y NumPy. pandas, plotly.express, openpyxl y el resto de reportabilidad se importan recién
+donde se usan (al mostrar una sección o procesar un archivo), así la primera pantalla de una sesión
+nueva o de un servidor recién iniciado no espera importaciones que todavía no necesita.
+"""
+import streamlit as st
+
+from reportabilidad.estilos import TARJETA, TEXTO, set_spanish_locale
+
+TITULO_PAGINA = "Dashboard de Reportabilidad SIMON IV Truper - Sistech & Solusof"
+
+ESTILOS = f"""
+<style>
+    /* Estilo general para asegurar texto negro y negrita */
+    body, .stApp, .stMarkdown, .stMetricLabel, .stMetricValue, .stButton>button, .stSubheader, .stDataFrame, div[data-testid="stDataFrame"] table {{
+        {TEXTO}
+    }}
+    h1, h2, h3, h4, h5, h6 {{
+        {TEXTO}
+    }}
+    /* Estilo específico para el contenido de la tabla */
+    div[data-testid="stDataFrame"] tbody tr td, div[data-testid="stDataFrame"] thead tr th {{
+        {TEXTO}
+    }}
+
+    /* Estilo para las tarjetas de métricas (KPIs) */
+    .stMetric {{
+        {TARJETA}
+        transition: 0.3s;
+    }}
+    .stMetric:hover {{
+        box-shadow: 0 8px 16px 0 rgba(0,0,0,0.2);
+    }}
+
+    /* Reglas para la impresión a PDF */
+    @media print {{
+        [data-testid="stSidebar"], [data-testid="stToolbar"] {{ display: none; }}
+        [data-testid="stAppViewContainer"] {{ padding: 0 !important; }}
+        .main .block-container {{ padding: 1rem !important; }}
+    }}
+</style>
+"""
+
+
+def setup_page(page_title=TITULO_PAGINA):
+    """Primera llamada de cada dashboard: idioma, configuración de la página y estilos."""
+    set_spanish_locale()
+    st.set_page_config(page_title=page_title, page_icon="📊", layout="wide")
+    st.markdown(ESTILOS, unsafe_allow_html=True)
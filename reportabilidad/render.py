@@ -0,0 +1,217 @@
+"""Renderizado del reporte sin servidor de Streamlit ni navegador.
+
+Genera, para cada libro o fecha del histórico, un HTML autocontenido con las mismas secciones,
+figuras de Plotly e indicadores de eficiencia que los dashboards y, opcionalmente, las figuras como
+imágenes estáticas y un PDF (estas dos opciones requieren el paquete `kaleido`). Los reportes se
+generan en paralelo, un proceso por entrada.
+
+Uso:
+
+    python -m reportabilidad.render libros_o_carpetas... --salida reportes/ [--pdf] [--imagenes png]
+    python -m reportabilidad.render --desde 2025-08-01 --hasta 2025-08-31 --salida reportes/
+"""
+import argparse
+import html
+import importlib.util
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+import plotly.graph_objects as go
+
+from reportabilidad.estilos import TARJETA, TEXTO, set_spanish_locale
+from reportabilidad.excel import SECCIONES
+from reportabilidad.graficos import (build_efficiency_figure, build_section_view, efficiency_indicators, efficiency_labels,
+                                     get_eficiencia_emoji, short_name)
+
+ESTILOS_HTML = f"""
+    body {{ font-family: Arial, sans-serif; {TEXTO} margin: 2rem; }}
+    h1, h2, h3 {{ {TEXTO} }}
+    .metricas {{ display: flex; gap: 1rem; margin: 1rem 0; }}
+    .metrica {{ flex: 1; {TARJETA} }}
+    .metrica .etiqueta {{ font-size: 0.9rem; }}
+    .metrica .valor {{ font-size: 1.8rem; }}
+    table {{ border-collapse: collapse; margin: 1rem 0; }}
+    th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: right; }}
+    section {{ page-break-after: always; }}
+"""
+
+
+def _metric_cards(metricas):
+    cards = "".join(
+        f'<div class="metrica"><div class="etiqueta">{html.escape(label)}</div><div class="valor">{html.escape(value)}</div></div>'
+        for label, value in metricas
+    )
+    return f'<div class="metricas">{cards}</div>'
+
+
+def render_html(titulo, sections):
+    """Devuelve el HTML autocontenido (con plotly.js incluido una sola vez) de las tres secciones."""
+    partes = []
+    include_js = True
+    for section in SECCIONES:
+        section_data = sections[section]
+        view = build_section_view(section_data)
+        figuras = [
+            ("Comparativa de Cantidad de Placas por Rango", view['fig_cant']),
+            ("Distribución Porcentual por Rango", view['fig_perc']),
+            ("Análisis de Eficiencia por Rango (%)", build_efficiency_figure(section_data)),
+        ]
+        partes.append(f"<section><h2>📊 Análisis: {html.escape(section)}</h2>")
+        partes.append(_metric_cards(
+            [("Total Placas en Sección", f"{view['total']:,}")]
+            + [(f"Total {short_name(p)}", f"{t:,}") for p, t in view['totales'].items()]
+        ))
+        for subtitulo, fig in figuras:
+            partes.append(f"<h3>{html.escape(subtitulo)}</h3>")
+            partes.append(fig.to_html(full_html=False, include_plotlyjs=include_js))
+            include_js = False
+        if view['cuantiles'] is not None:
+            partes.append("<h3>Percentiles de Latencia</h3>")
+            partes.append(view['cuantiles'].to_html())
+        partes.append("<h3>Tabla de Datos Resumen</h3>")
+        partes.append(view['pivot'].to_html())
+        partes.append("<h3>Indicadores de Eficiencia Clave</h3>")
+        etiqueta_1, etiqueta_2, etiqueta_total = efficiency_labels()
+        for provider, (ef1, ef2, total) in efficiency_indicators(section_data).items():
+            partes.append(f"<h4>{html.escape(provider)}</h4>")
+            partes.append(_metric_cards([
+                (etiqueta_1, f"{ef1:.1f}%"),
+                (etiqueta_2, f"{ef2:.1f}%"),
+                (f"{etiqueta_total} {get_eficiencia_emoji(total)}", f"{total:.1f}%"),
+            ]))
+        partes.append("</section>")
+    return (
+        f'<!DOCTYPE html>\n<html lang="es"><head><meta charset="utf-8"><title>{html.escape(titulo)}</title>'
+        f"<style>{ESTILOS_HTML}</style></head><body><h1>{html.escape(titulo)}</h1>{''.join(partes)}</body></html>"
+    )
+
+
+def _static_figures(sections):
+    """Figuras con título propio para exportar como imágenes (incluye la tabla resumen)."""
+    for section in SECCIONES:
+        view = build_section_view(sections[section])
+        pivot = view['pivot']
+        tabla = go.Figure(go.Table(
+            header=dict(values=["Prestador"] + [f"{a} {b}" for a, b in pivot.columns]),
+            cells=dict(values=[list(pivot.index)] + [list(map(str, pivot[c])) for c in pivot.columns]),
+        ))
+        for nombre, fig in [("cantidad", view['fig_cant']), ("porcentaje", view['fig_perc']),
+                            ("eficiencia", build_efficiency_figure(sections[section])), ("tabla", tabla)]:
+            # Copia: las figuras memorizadas se comparten y no deben modificarse.
+            fig = go.Figure(fig).update_layout(title_text=f"<b>{section} - {nombre.capitalize()}</b>", width=1100, height=550)
+            yield f"{section}_{nombre}".replace(" ", "_"), fig
+
+
+def write_static(base_path, sections, formato=None, pdf=False):
+    """Escribe las figuras como imágenes (`formato`: png, svg, ...) y/o un PDF con una página por figura."""
+    try:
+        import kaleido  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("exportar imágenes o PDF requiere el paquete 'kaleido' (pip install kaleido)") from e
+    written, pages = [], []
+    for nombre, fig in _static_figures(sections):
+        if formato:
+            path = f"{base_path}_{nombre}.{formato}"
+            fig.write_image(path)
+            written.append(path)
+        if pdf:
+            from PIL import Image
+
+            pages.append(Image.open(io.BytesIO(fig.to_image(format="png"))).convert("RGB"))
+    if pages:
+        path = f"{base_path}.pdf"
+        pages[0].save(path, save_all=True, append_images=pages[1:])
+        written.append(path)
+    return written
+
+
+def render_job(kind, value, salida, formato=None, pdf=False):
+    """Genera el reporte de un libro (`kind` = 'archivo') o de una fecha del histórico ('fecha')."""
+    set_spanish_locale()
+    result = {"origen": value, "archivos": [], "error": None, "omitido": None}
+    try:
+        if kind == "archivo":
+            from reportabilidad.lote import process_sheet
+
+            parsed = process_sheet(value, value)
+            if parsed["error"]:
+                raise ValueError(parsed["error"])
+            sections, fecha = parsed["secciones"], parsed["fecha"] and date.fromisoformat(parsed["fecha"])
+            nombre = os.path.splitext(os.path.basename(value))[0]
+        else:
+            from reportabilidad.historico import load_day
+
+            fecha = date.fromisoformat(value)
+            sections = load_day(fecha)
+            if sections is None:
+                raise ValueError("no hay resultados guardados para esa fecha")
+            nombre = f"reporte_{fecha.isoformat()}"
+
+        titulo = "Reportabilidad SIMON IV Truper - " + (fecha.strftime('%d de %B, %Y') if fecha else nombre)
+        base_path = os.path.join(salida, nombre)
+        with open(f"{base_path}.html", "w", encoding="utf-8") as f:
+            f.write(render_html(titulo, sections))
+        result["archivos"].append(f"{base_path}.html")
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+    # El HTML ya quedó escrito: si fallan las imágenes o el PDF, el reporte cuenta como generado.
+    if formato or pdf:
+        try:
+            result["archivos"].extend(write_static(base_path, sections, formato, pdf))
+        except Exception as e:
+            result["omitido"] = f"imágenes/PDF no generados: {e}"
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera los reportes de reportabilidad sin servidor de Streamlit.")
+    parser.add_argument("rutas", nargs="*", help="Libros .xlsx, carpetas o comodines.")
+    parser.add_argument("--desde", type=date.fromisoformat, help="Primera fecha del histórico a renderizar (AAAA-MM-DD).")
+    parser.add_argument("--hasta", type=date.fromisoformat, help="Última fecha del histórico a renderizar (AAAA-MM-DD).")
+    parser.add_argument("--salida", default="reportes", help="Carpeta donde escribir los reportes.")
+    parser.add_argument("--imagenes", choices=["png", "svg", "jpeg", "webp", "pdf"], help="Además exporta cada figura en este formato.")
+    parser.add_argument("--pdf", action="store_true", help="Además genera un PDF por reporte.")
+    parser.add_argument("--procesos", type=int, default=None, help="Cantidad de procesos (por defecto, todos los núcleos).")
+    args = parser.parse_args(argv)
+    # Se verifica antes de lanzar los procesos, para no escribir los HTML y fallar en cada reporte.
+    if (args.imagenes or args.pdf) and importlib.util.find_spec("kaleido") is None:
+        parser.error("--imagenes y --pdf requieren el paquete 'kaleido' (pip install kaleido)")
+    if args.pdf and importlib.util.find_spec("PIL") is None:
+        parser.error("--pdf requiere el paquete 'Pillow' (pip install Pillow)")
+
+    jobs = []
+    if args.rutas:
+        from reportabilidad.lote import expand_paths
+
+        jobs += [("archivo", path) for path in expand_paths(args.rutas)]
+    if args.desde or args.hasta:
+        from reportabilidad.historico import available_dates
+
+        desde, hasta = args.desde or date.min, args.hasta or date.max
+        jobs += [("fecha", f.isoformat()) for f in available_dates() if desde <= f <= hasta]
+    if not jobs:
+        parser.error("indica libros/carpetas o un rango de fechas del histórico")
+
+    os.makedirs(args.salida, exist_ok=True)
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.procesos) as pool:
+        futures = [pool.submit(render_job, kind, value, args.salida, args.imagenes, args.pdf) for kind, value in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            if result["error"]:
+                failed += 1
+                print(f"ERROR {result['origen']}: {result['error']}", file=sys.stderr)
+            else:
+                print(f"{result['origen']} -> {', '.join(result['archivos'])}", file=sys.stderr)
+                if result["omitido"]:
+                    print(f"AVISO {result['origen']}: {result['omitido']}", file=sys.stderr)
+    print(f"{len(jobs) - failed} reportes generados, {failed} con error.", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Medición del tiempo de cada etapa de un rerun y registro en formato JSON lines.
+
+Al comienzo del script se llama a start_run(); a partir de ahí cualquier bloque `with stage(...)`
+(en el script o en los módulos de reportabilidad) suma su duración al registro del rerun actual.
+Si no hay un registro activo, stage() no hace nada. Cada sesión de Streamlit ejecuta el script en
+su propio hilo, y el registro activo se guarda en una ContextVar, así que las sesiones no se mezclan.
+
+El archivo de registro rota al llegar a MAX_BYTES_LOG (tiempos.jsonl.1, .2, ...), y se conservan
+COPIAS_LOG archivos anteriores.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+DEFAULT_LOG_PATH = os.environ.get(
+    "REPORTABILIDAD_LOG_TIEMPOS",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "tiempos.jsonl"),
+)
+
+MAX_BYTES_LOG = 10 * 1024**2
+COPIAS_LOG = 3
+
+_timer_actual = ContextVar("timer_actual", default=None)
+
+# Un manejador por archivo, compartido por todas las sesiones: serializa las escrituras y la rotación.
+_handlers = {}
+_handlers_lock = threading.Lock()
+
+
+def _log_handler(path):
+    with _handlers_lock:
+        if path not in _handlers:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=MAX_BYTES_LOG, backupCount=COPIAS_LOG, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            _handlers[path] = handler
+        return _handlers[path]
+
+
+class StageTimer:
+    """Duraciones de las etapas de un rerun, más datos de contexto (hash del archivo, hoja, filas...)."""
+
+    def __init__(self, **contexto):
+        self.inicio = time.perf_counter()
+        self.contexto = dict(contexto)
+        self.etapas = {}  # etapa -> [segundos acumulados, cantidad de veces]
+
+    def add(self, nombre, segundos):
+        acumulado = self.etapas.setdefault(nombre, [0.0, 0])
+        acumulado[0] += segundos
+        acumulado[1] += 1
+
+    def total(self):
+        return time.perf_counter() - self.inicio
+
+    def summary(self):
+        """Lista de (etapa, milisegundos, veces) en el orden en que se midieron."""
+        return [(nombre, segundos * 1000, veces) for nombre, (segundos, veces) in self.etapas.items()]
+
+    def write_log(self, path=DEFAULT_LOG_PATH):
+        """Agrega una línea JSON con el contexto, la duración de cada etapa y el total del rerun (el
+        archivo rota al superar MAX_BYTES_LOG)."""
+        registro = {
+            "fecha_hora": datetime.now().isoformat(timespec="seconds"),
+            **self.contexto,
+            "etapas_ms": {nombre: round(ms, 3) for nombre, ms, _ in self.summary()},
+            "total_ms": round(self.total() * 1000, 3),
+        }
+        linea = json.dumps(registro, ensure_ascii=False, default=str)
+        _log_handler(path).handle(logging.makeLogRecord({"msg": linea, "levelno": logging.INFO}))
+
+
+def start_run(**contexto):
+    """Crea el registro del rerun actual y lo deja activo para stage() y annotate()."""
+    timer = StageTimer(**contexto)
+    _timer_actual.set(timer)
+    return timer
+
+
+@contextmanager
+def stage(nombre):
+    """Mide la duración del bloque y la suma a la etapa `nombre` del rerun actual."""
+    timer = _timer_actual.get()
+    if timer is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(nombre, time.perf_counter() - inicio)
+
+
+def annotate(**contexto):
+    """Agrega datos de contexto (hash del archivo, hoja, cantidad de filas...) al rerun actual."""
+    timer = _timer_actual.get()
+    if timer is not None:
+        timer.contexto.update(contexto)
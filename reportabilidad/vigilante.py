@@ -0,0 +1,132 @@
+"""Vigilante de carpeta: procesa los libros diarios a medida que llegan, sin que nadie los suba.
+
+Cada `--intervalo` segundos revisa la carpeta. Cada libro nuevo o modificado se procesa cuando deja
+de cambiar, es decir, cuando tiene el mismo tamaño y la misma fecha de modificación en dos revisiones
+seguidas o no se modificó en los últimos `--estabilidad` segundos. El procesamiento es el mismo del
+lote: se detectan las filas 'Prestadores', se leen las tres tablas y se deduce la fecha del nombre.
+
+Los resultados se guardan en el histórico junto con las figuras ya construidas, así el dashboard
+abre esa fecha al instante. Los libros ya procesados se registran en la tabla `archivos` del
+histórico para no repetirlos.
+
+Uso:
+
+    python -m reportabilidad.vigilante carpeta/ [--intervalo 30] [--todas-las-hojas] [--una-vez]
+"""
+import argparse
+import os
+import sys
+import time
+from contextlib import closing
+from datetime import datetime
+
+from reportabilidad.graficos import section_figure_specs
+from reportabilidad.historico import DEFAULT_DB_PATH, connect, save_day, save_figures
+from reportabilidad.lote import build_jobs, process_batch
+
+ESQUEMA_ARCHIVOS = """
+CREATE TABLE IF NOT EXISTS archivos (
+    ruta TEXT PRIMARY KEY,
+    tamano INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    procesado TEXT NOT NULL,
+    fechas TEXT,
+    error TEXT
+);
+"""
+
+
+def scan(directory):
+    """Devuelve {ruta: (tamaño, mtime)} de los .xlsx de la carpeta (sin los temporales '~$' de Excel)."""
+    found = {}
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.lower().endswith(".xlsx") and not entry.name.startswith("~$"):
+            stat = entry.stat()
+            found[entry.path] = (stat.st_size, stat.st_mtime)
+    return found
+
+
+def pending(found, db_path=DEFAULT_DB_PATH):
+    """Rutas que no se procesaron aún con ese mismo tamaño y fecha de modificación."""
+    with closing(connect(db_path)) as conn:
+        conn.executescript(ESQUEMA_ARCHIVOS)
+        done = {ruta: (tamano, mtime) for ruta, tamano, mtime in conn.execute("SELECT ruta, tamano, mtime FROM archivos")}
+    return [path for path, state in found.items() if done.get(path) != state]
+
+
+def ingest(paths, found, all_sheets=False, max_workers=None, db_path=DEFAULT_DB_PATH, log=print):
+    """Procesa los libros, guarda resultados y figuras de cada día y los registra como procesados."""
+    results = process_batch(build_jobs([(path, path) for path in paths], all_sheets=all_sheets), max_workers=max_workers)
+    por_archivo = {path: {"fechas": [], "errores": []} for path in paths}
+    for r in results:
+        estado = por_archivo[r["archivo"]]
+        if r["error"]:
+            estado["errores"].append(f"{r['hoja'] or '-'}: {r['error']}")
+        elif not r["fecha"]:
+            estado["errores"].append(f"{r['hoja']}: no se pudo deducir la fecha del nombre del archivo o de la hoja")
+        else:
+            save_day(r["fecha"], r["secciones"], db_path)
+            save_figures(r["fecha"], {section: section_figure_specs(data) for section, data in r["secciones"].items()}, db_path)
+            estado["fechas"].append(r["fecha"])
+
+    with closing(connect(db_path)) as conn, conn:
+        conn.executescript(ESQUEMA_ARCHIVOS)
+        for path, estado in por_archivo.items():
+            tamano, mtime = found[path]
+            conn.execute(
+                "INSERT OR REPLACE INTO archivos VALUES (?, ?, ?, ?, ?, ?)",
+                (path, tamano, mtime, datetime.now().isoformat(timespec="seconds"),
+                 ",".join(estado["fechas"]) or None, "; ".join(estado["errores"]) or None),
+            )
+            if estado["errores"]:
+                log(f"ERROR {path}: {'; '.join(estado['errores'])}")
+            if estado["fechas"]:
+                log(f"{path} -> {', '.join(estado['fechas'])}")
+    return por_archivo
+
+
+def watch(directory, interval=30, stability=10, all_sheets=False, max_workers=None, once=False,
+          db_path=DEFAULT_DB_PATH, log=print):
+    """Revisa la carpeta cada `interval` segundos y procesa los libros nuevos cuando dejan de cambiar."""
+    previous = {}
+    while True:
+        found = scan(directory)
+        now = time.time()
+        # Un libro que todavía se está copiando cambia de tamaño o de fecha entre revisiones.
+        stable = {
+            path: state for path, state in found.items()
+            if once or previous.get(path) == state or now - state[1] >= stability
+        }
+        previous = found
+        nuevos = pending(stable, db_path)
+        if nuevos:
+            log(f"{len(nuevos)} libros nuevos en {directory}")
+            ingest(nuevos, stable, all_sheets, max_workers, db_path, log)
+        if once:
+            return
+        time.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Procesa automáticamente los libros que llegan a una carpeta.")
+    parser.add_argument("carpeta", help="Carpeta donde se dejan los libros diarios.")
+    parser.add_argument("--intervalo", type=float, default=30, help="Segundos entre revisiones de la carpeta.")
+    parser.add_argument("--estabilidad", type=float, default=10,
+                        help="Segundos sin modificaciones para considerar que un libro terminó de copiarse.")
+    parser.add_argument("--todas-las-hojas", action="store_true", help="Procesa todas las hojas de cada libro.")
+    parser.add_argument("--procesos", type=int, default=None, help="Cantidad de procesos (por defecto, todos los núcleos).")
+    parser.add_argument("--una-vez", action="store_true", help="Procesa lo pendiente y termina (para tareas programadas).")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.carpeta):
+        parser.error(f"no existe la carpeta {args.carpeta}")
+    log = lambda msg: print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {msg}", file=sys.stderr, flush=True)
+    try:
+        watch(args.carpeta, args.intervalo, args.estabilidad, args.todas_las_hojas, args.procesos, args.una_vez, log=log)
+    except KeyboardInterrupt:
+        log("Vigilante detenido.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())